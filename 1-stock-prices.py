@@ -12,6 +12,8 @@ No "shorting" - you must buy before you sell. You may not buy and sell in the
 same time step (at least 1 minute must pass).
 """
 
+import collections
+
 # Brute force: try every combination of prices and keep track of the max diff
 # between prices.
 def get_max_profit(prices):
@@ -133,8 +135,705 @@ def get_max_profit3(prices):
 # Space complexity: O(1)
 
 
+# Streaming approach: same greedy scan as get_max_profit3, but prices arrive one
+# at a time from a live feed, so we never hold the whole day in memory. Keep
+# only the running min, the best profit, and the indices of the best buy/sell.
+class ProfitTracker(object):
+    """Track the best profit over a stream of prices.
+
+    >>> tracker = ProfitTracker()
+    >>> tracker.insert(10)
+    >>> tracker.insert(7)
+    >>> tracker.get_max_profit()
+    -3
+    >>> tracker.insert(5)
+    >>> tracker.insert(8)
+    >>> tracker.insert(11)
+    >>> tracker.insert(9)
+    >>> tracker.get_max_profit()
+    6
+    >>> tracker.get_buy_sell()
+    (2, 4)
+
+    >>> ProfitTracker([10]).get_max_profit()
+    Traceback (most recent call last):
+        ...
+    IndexError: Getting a profit requires at least 2 prices
+    """
+
+    def __init__(self, prices=None):
+        self.count = 0
+        self.min_price = None
+        self.min_idx = None
+        self.max_profit = None
+        self.buy_idx = None
+        self.sell_idx = None
+
+        # prices can be any iterable, including a generator
+        if prices is not None:
+            self.extend(prices)
+
+    def insert(self, price):
+        """Record a new price; update min price and max profit."""
+
+        if self.count == 0:
+            self.min_price = price
+            self.min_idx = 0
+
+        else:
+            # calculate profit first, before updating min_price, so we never buy
+            # and sell in the same time step
+            profit = price - self.min_price
+
+            # the first profit initializes max_profit, which also lets us find
+            # the smallest negative on days that only go down
+            if self.max_profit is None or profit > self.max_profit:
+                self.max_profit = profit
+                self.buy_idx = self.min_idx
+                self.sell_idx = self.count
+
+            if price < self.min_price:
+                self.min_price = price
+                self.min_idx = self.count
+
+        self.count += 1
+
+    def extend(self, prices):
+        """Record every price from an iterable."""
+
+        for price in prices:
+            self.insert(price)
+
+    def insert_chunk(self, prices):
+        """Record a chunk of prices (e.g. a NumPy array) in one vectorized step.
+
+        >>> tracker = ProfitTracker()
+        >>> tracker.insert_chunk([10, 7, 5])
+        >>> tracker.insert_chunk([8, 11, 9])
+        >>> tracker.get_max_profit()
+        6
+        >>> tracker.get_buy_sell()
+        (2, 4)
+        """
+
+        import numpy as np
+
+        prices = np.asarray(prices)
+        if len(prices) == 0:
+            return
+
+        # the very first price only seeds min_price
+        if self.count == 0:
+            self.insert(prices[0].item())
+            prices = prices[1:]
+            if len(prices) == 0:
+                return
+
+        # lowest price seen before each price in the chunk, carrying the running
+        # min over from earlier chunks
+        min_prices = np.minimum.accumulate(prices)
+        prior_mins = np.empty_like(min_prices)
+        prior_mins[0] = self.min_price
+        np.minimum(self.min_price, min_prices[:-1], out=prior_mins[1:])
+
+        profits = prices - prior_mins
+        best = profits.argmax()
+
+        if self.max_profit is None or profits[best] > self.max_profit:
+            self.max_profit = profits[best].item()
+            self.sell_idx = self.count + int(best)
+
+            # the buy was either inside this chunk, before the sale, or the
+            # min carried over from earlier chunks
+            if best > 0 and min_prices[best - 1] < self.min_price:
+                self.buy_idx = self.count + int(prices[:best].argmin())
+            else:
+                self.buy_idx = self.min_idx
+
+        if min_prices[-1] < self.min_price:
+            self.min_price = min_prices[-1].item()
+            self.min_idx = self.count + int(prices.argmin())
+
+        self.count += len(prices)
+
+    def get_max_profit(self):
+        """Return the best profit seen so far."""
+
+        if self.count < 2:
+            raise IndexError('Getting a profit requires at least 2 prices')
+
+        return self.max_profit
+
+    def get_buy_sell(self):
+        """Return the (buy, sell) indices of the best profit seen so far."""
+
+        if self.count < 2:
+            raise IndexError('Getting a profit requires at least 2 prices')
+
+        return self.buy_idx, self.sell_idx
+
+
+def get_max_profit4(prices):
+    """Return the daily maximum profit from any iterable of prices.
+
+    >>> get_max_profit4(iter([10, 7, 5, 8, 11, 9]))
+    6
+
+    >>> get_max_profit4(price for price in [10, 9, 8, 7, 6, 5])
+    -1
+    """
+
+    return ProfitTracker(prices).get_max_profit()
+
+# Runtime: O(1) per insert, O(n) for the whole stream
+# Space complexity: O(1), since we never store the prices themselves
+
+
+# Vectorized approach for many symbols at once: each row of the matrix is one
+# symbol's day. Instead of walking each row in Python, let NumPy build the running
+# min for every row with minimum.accumulate, then the best profit for selling at
+# minute j is prices[j] minus the running min up to minute j - 1.
+def get_max_profit_batch(prices):
+    """Return (profits, buy indices, sell indices) for each row of a price matrix.
+
+    >>> profits, buys, sells = get_max_profit_batch([[10, 7, 5, 8, 11, 9],
+    ...                                              [10, 9, 8, 7, 6, 5],
+    ...                                              [10, 10, 10, 10, 10, 10]])
+    >>> profits.tolist()
+    [6, -1, 0]
+    >>> buys.tolist()
+    [2, 0, 0]
+    >>> sells.tolist()
+    [4, 1, 1]
+
+    >>> get_max_profit_batch([[10]])
+    Traceback (most recent call last):
+        ...
+    IndexError: Getting a profit requires at least 2 prices
+    """
+
+    import numpy as np
+
+    prices = np.atleast_2d(np.asarray(prices))
+
+    # make sure we have at least 2 prices
+    if prices.shape[1] < 2:
+        raise IndexError('Getting a profit requires at least 2 prices')
+
+    # running min of every row; column j holds the lowest price in minutes 0..j
+    min_prices = np.minimum.accumulate(prices, axis=1)
+
+    # profit for selling at minute j (j >= 1) after buying at the lowest price
+    # before j; calculated before the min includes minute j, like get_max_profit3
+    profits = prices[:, 1:] - min_prices[:, :-1]
+
+    # argmax returns the first best minute, matching the greedy scan's tie-break
+    best = profits.argmax(axis=1)
+    rows = np.arange(prices.shape[0])
+    max_profits = profits[rows, best]
+    sells = best + 1
+
+    # the buy index is where the running min was last lowered before the sale;
+    # carry the latest "new min" minute forward with maximum.accumulate
+    minutes = np.arange(prices.shape[1])
+    new_min = np.ones(prices.shape, dtype=bool)
+    new_min[:, 1:] = prices[:, 1:] < min_prices[:, :-1]
+    min_idx = np.maximum.accumulate(np.where(new_min, minutes, 0), axis=1)
+    buys = min_idx[rows, best]
+
+    return max_profits, buys, sells
+
+# Runtime: O(s*n) for s symbols of n minutes, but in NumPy instead of Python
+# Space complexity: O(s*n) for the running min and profit matrices
+
+
+# Out-of-core approach for years of minute data stored as flat binary files of
+# fixed-width prices (e.g. '<i4' or '<f8'), one trading day after another.
+# Memory-map each file instead of loading it into a list, and feed it to
+# ProfitTracker chunk by chunk so only the pages we're scanning are resident.
+# The tracker carries the running min across chunk boundaries.
+def iter_price_file_profits(paths, dtype='<i4', minutes_per_day=390,
+                            chunk_size=1 << 16):
+    """Yield (path, day, max_profit, buy_idx, sell_idx) for each day of each file.
+
+    After the last day of a file, yield its whole-file result with day None.
+    Indices are minutes past the start of the day, or of the file.
+
+    >>> import os, tempfile
+    >>> import numpy as np
+    >>> fd, path = tempfile.mkstemp()
+    >>> os.close(fd)
+    >>> np.array([10, 7, 5, 8, 11, 9, 12, 11, 10, 9, 8, 7],
+    ...          dtype='<i4').tofile(path)
+    >>> for _, day, profit, buy, sell in iter_price_file_profits(
+    ...         [path], minutes_per_day=6, chunk_size=4):
+    ...     print day, profit, buy, sell
+    0 6 2 4
+    1 -1 0 1
+    None 7 2 6
+    >>> os.remove(path)
+    """
+
+    import os
+    import numpy as np
+
+    for path in paths:
+
+        # an empty file can't be memory-mapped; it has no profit to report
+        if os.path.getsize(path) == 0:
+            continue
+
+        prices = np.memmap(path, dtype=dtype, mode='r')
+        file_tracker = ProfitTracker()
+
+        for day, day_start in enumerate(xrange(0, len(prices), minutes_per_day)):
+            day_end = min(day_start + minutes_per_day, len(prices))
+            day_tracker = ProfitTracker()
+
+            for start in xrange(day_start, day_end, chunk_size):
+                chunk = prices[start:min(start + chunk_size, day_end)]
+                day_tracker.insert_chunk(chunk)
+                file_tracker.insert_chunk(chunk)
+
+            # a trailing partial day with a single tick has no profit
+            if day_tracker.count >= 2:
+                buy, sell = day_tracker.get_buy_sell()
+                yield path, day, day_tracker.get_max_profit(), buy, sell
+
+        if file_tracker.count >= 2:
+            buy, sell = file_tracker.get_buy_sell()
+            yield path, None, file_tracker.get_max_profit(), buy, sell
+
+        # drop the mapping before moving on to the next file
+        del prices
+
+# Runtime: O(n) over all ticks, with O(n / chunk_size) Python-level steps
+# Space complexity: O(chunk_size); the file itself stays in the page cache
+
+
+# Range queries: to answer "best profit between minute a and minute b" without
+# rescanning the slice, build a segment tree once. Each node stores the min
+# price, the max price, and the best profit within its range. Two neighbouring
+# ranges combine in O(1): the best profit is the best of the left, the best of
+# the right, or buying at the left's min and selling at the right's max.
+# The tree lives in flat lists, with node i's children at 2i and 2i + 1.
+class ProfitIndex(object):
+    """Answer max profit over any [start, end) window of a day's prices.
+
+    >>> index = ProfitIndex([10, 7, 5, 8, 11, 9])
+    >>> index.get_max_profit(0, 6)
+    6
+    >>> index.get_max_profit(0, 3)
+    -2
+    >>> index.get_max_profit(4, 6)
+    -2
+    >>> index.update(5, 20)
+    >>> index.get_max_profit(3, 6)
+    12
+
+    >>> index.get_max_profit(2, 3)
+    Traceback (most recent call last):
+        ...
+    IndexError: Getting a profit requires at least 2 prices
+    """
+
+    # a node over an empty range can't contribute a min, max or profit
+    EMPTY = (float('inf'), float('-inf'), float('-inf'))
+
+    def __init__(self, prices):
+        self.length = len(prices)
+
+        # round the leaf count up to a power of 2 so every node has 2 children
+        self.size = 1
+        while self.size < self.length:
+            self.size *= 2
+
+        self.mins = [self.EMPTY[0]] * (2 * self.size)
+        self.maxs = [self.EMPTY[1]] * (2 * self.size)
+        self.profits = [self.EMPTY[2]] * (2 * self.size)
+
+        # a single price is a leaf; it has no profit since we can't buy and
+        # sell in the same time step
+        for i, price in enumerate(prices):
+            self.mins[self.size + i] = price
+            self.maxs[self.size + i] = price
+
+        # build every parent from its children, bottom-up
+        for node in xrange(self.size - 1, 0, -1):
+            self._pull(node)
+
+    def _combine(self, left, right):
+        """Return the (min, max, profit) of two neighbouring ranges."""
+
+        left_min, left_max, left_profit = left
+        right_min, right_max, right_profit = right
+
+        return (min(left_min, right_min),
+                max(left_max, right_max),
+                max(left_profit, right_profit, right_max - left_min))
+
+    def _node(self, node):
+        return self.mins[node], self.maxs[node], self.profits[node]
+
+    def _pull(self, node):
+        (self.mins[node],
+         self.maxs[node],
+         self.profits[node]) = self._combine(self._node(2 * node),
+                                             self._node(2 * node + 1))
+
+    def update(self, idx, price):
+        """Correct the price at minute idx."""
+
+        if not 0 <= idx < self.length:
+            raise IndexError('Minute %i is out of range' % idx)
+
+        node = self.size + idx
+        self.mins[node] = price
+        self.maxs[node] = price
+
+        # only the ancestors of the leaf need to be rebuilt
+        node //= 2
+        while node:
+            self._pull(node)
+            node //= 2
+
+    def get_max_profit(self, start=0, end=None):
+        """Return the best profit buying and selling within [start, end)."""
+
+        if end is None:
+            end = self.length
+
+        start = max(start, 0)
+        end = min(end, self.length)
+
+        # make sure we have at least 2 prices
+        if end - start < 2:
+            raise IndexError('Getting a profit requires at least 2 prices')
+
+        # walk up from both ends of the window; the combine isn't commutative,
+        # so keep the pieces from the left and right sides separate
+        left = self.EMPTY
+        right = self.EMPTY
+        lo = start + self.size
+        hi = end + self.size
+
+        while lo < hi:
+            if lo & 1:
+                left = self._combine(left, self._node(lo))
+                lo += 1
+            if hi & 1:
+                hi -= 1
+                right = self._combine(self._node(hi), right)
+            lo //= 2
+            hi //= 2
+
+        return self._combine(left, right)[2]
+
+# Runtime: O(n) to build; O(log n) per query or update
+# Space complexity: O(n) for three flat lists of 2 * size nodes
+
+
+# Handle more than 1 purchase and 1 sale: up to k transactions, a fee paid on
+# every sale, and a cooldown of m minutes after a sale before we can buy again.
+# Dynamic programming over time, where for each j we keep the best cash we can
+# have after completing j transactions, and the best value while holding the
+# stock during transaction j. Selling at minute t uses the holdings from before
+# t, so we still can't buy and sell in the same time step, and buying at t uses
+# the cash from minute t - m - 1, so m minutes pass between a sale and a buy.
+# Since we're free to not trade at all, the profit is never negative here (unlike
+# get_max_profit3, which has to make exactly 1 trade). Pass k=None for no limit
+# on the number of transactions.
+def get_max_profit_k(prices, k=1, fee=0, cooldown=0):
+    """Return the maximum profit from up to k transactions.
+
+    >>> get_max_profit_k([10, 7, 5, 8, 11, 9])
+    6
+    >>> get_max_profit_k([3, 3, 5, 0, 0, 3, 1, 4], k=2)
+    6
+    >>> get_max_profit_k([1, 2, 3, 0, 2], k=None, cooldown=1)
+    3
+    >>> get_max_profit_k([1, 3, 2, 8, 4, 9], k=None, fee=2)
+    8
+    >>> get_max_profit_k([10, 9, 8, 7, 6, 5], k=2)
+    0
+
+    >>> get_max_profit_k([10])
+    Traceback (most recent call last):
+        ...
+    IndexError: Getting a profit requires at least 2 prices
+    """
+
+    # make sure we have at least 2 prices
+    if len(prices) < 2:
+        raise IndexError('Getting a profit requires at least 2 prices')
+
+    # with no limit, we only need to know whether we're holding or not
+    limited = k is not None
+    slots = k + 1 if limited else 1
+
+    # cash[j]: best cash after completing j transactions
+    # hold[j]: best cash while holding the stock bought for transaction j
+    no_value = float('-inf')
+    start_cash = [0] + [no_value] * (slots - 1)
+    cash = list(start_cash)
+    hold = [no_value] * slots
+
+    # cash from the last cooldown + 1 minutes, so we know what we could spend
+    # at minute t - cooldown - 1
+    history = collections.deque(maxlen=cooldown + 1)
+
+    for price in prices:
+
+        if len(history) == cooldown + 1:
+            spendable = history[0]
+        else:
+            spendable = start_cash
+
+        for j in xrange(slots):
+            # buying starts transaction j from the cash we had after j - 1
+            before = j - 1 if limited else j
+            if before >= 0:
+                buy = spendable[before] - price
+            else:
+                buy = no_value
+
+            # sell using what we held before this minute, then buy
+            sell = hold[j] + price - fee
+            if sell > cash[j]:
+                cash[j] = sell
+            if buy > hold[j]:
+                hold[j] = buy
+
+        history.append(list(cash))
+
+    return max(cash)
+
+# Runtime: O(n*k)
+# Space complexity: O(k * (m + 1)) for the cooldown history; O(k) with no cooldown
+
+
+# Batched mode of get_max_profit_k: run the same recurrence for every row of a
+# symbols x minutes matrix at once, so each minute is a few NumPy operations
+# over all symbols and transactions instead of a Python loop per symbol.
+def get_max_profit_k_batch(prices, k=1, fee=0, cooldown=0):
+    """Return the maximum profit from up to k transactions for each row.
+
+    >>> get_max_profit_k_batch([[3, 3, 5, 0, 0, 3, 1, 4],
+    ...                         [7, 6, 4, 3, 1, 1, 1, 1]], k=2).tolist()
+    [6, 0]
+    >>> get_max_profit_k_batch([[1, 2, 3, 0, 2]], k=None, cooldown=1).tolist()
+    [3]
+    """
+
+    import numpy as np
+
+    prices = np.atleast_2d(np.asarray(prices))
+
+    # make sure we have at least 2 prices
+    if prices.shape[1] < 2:
+        raise IndexError('Getting a profit requires at least 2 prices')
+
+    limited = k is not None
+    slots = k + 1 if limited else 1
+    symbols = prices.shape[0]
+
+    # work in floats so -inf can mark states we can't reach
+    start_cash = np.full((symbols, slots), -np.inf)
+    start_cash[:, 0] = 0
+    cash = start_cash.copy()
+    hold = np.full((symbols, slots), -np.inf)
+    buy = np.full((symbols, slots), -np.inf)
+
+    history = collections.deque(maxlen=cooldown + 1)
+
+    for minute in xrange(prices.shape[1]):
+        price = prices[:, minute, np.newaxis]
+
+        if len(history) == cooldown + 1:
+            spendable = history[0]
+        else:
+            spendable = start_cash
+
+        if limited:
+            buy[:, 1:] = spendable[:, :-1] - price
+        else:
+            buy = spendable - price
+
+        np.maximum(cash, hold + price - fee, out=cash)
+        np.maximum(hold, buy, out=hold)
+
+        history.append(cash.copy())
+
+    profits = cash.max(axis=1)
+
+    # give integer prices back integer profits
+    if np.issubdtype(prices.dtype, np.integer) and float(fee).is_integer():
+        profits = profits.astype(prices.dtype)
+
+    return profits
+
+# Runtime: O(s*n*k), in O(n) NumPy steps over all s symbols at once
+# Space complexity: O(s * k * (m + 1))
+
+
+# Parallel batches: tens of thousands of (symbol, day) series are independent,
+# so fan them out over a process pool. Rather than pickling every list of
+# prices to the workers, pack all series into one flat shared-memory array of
+# int64s (plus the offset where each series starts) that the workers inherit
+# when the pool starts. Each task is just a range of series indices. A series of
+# floats is stored as the bits of its float64s, with a flag to read it back that
+# way, so integer series keep integer results even when some series are floats.
+_shared_series = {}
+
+
+def _init_profit_worker(prices, offsets, is_float, func):
+    """Give a pool worker NumPy views of the shared prices."""
+
+    import numpy as np
+
+    _shared_series['prices'] = np.frombuffer(prices, dtype=np.int64)
+    _shared_series['offsets'] = np.frombuffer(offsets, dtype=np.int64)
+    _shared_series['is_float'] = np.frombuffer(is_float, dtype=np.bool_)
+    _shared_series['func'] = func
+
+
+def _run_profit_jobs(job_range):
+    """Run the profit function on each series in [start, end)."""
+
+    import numpy as np
+
+    prices = _shared_series['prices']
+    offsets = _shared_series['offsets']
+    is_float = _shared_series['is_float']
+    func = _shared_series['func']
+
+    results = []
+    for job in xrange(*job_range):
+        series = prices[offsets[job]:offsets[job + 1]]
+        if is_float[job]:
+            series = series.view(np.float64)
+
+        try:
+            results.append((job, func(series.tolist()), None))
+        except IndexError as e:
+            # too few prices in one series shouldn't sink the whole batch
+            results.append((job, None, e))
+
+    return results
+
+
+def iter_max_profits_parallel(series, func=get_max_profit3, workers=None,
+                              chunk_size=256):
+    """Yield (index, max_profit, error) for each series, as workers finish.
+
+    error is None, unless the series has too few prices, when it's the
+    IndexError and max_profit is None.
+
+    >>> series = [[10, 7, 5, 8, 11, 9], [10, 9, 8, 7, 6, 5], [1, 2], [10],
+    ...           [1.5, 0.5]]
+    >>> for idx, profit, error in sorted(iter_max_profits_parallel(
+    ...         series, workers=2, chunk_size=1)):
+    ...     print idx, profit, error
+    0 6 None
+    1 -1 None
+    2 1 None
+    3 None Getting a profit requires at least 2 prices
+    4 -1.0 None
+    """
+
+    import ctypes
+    import multiprocessing
+    import numpy as np
+    from multiprocessing.sharedctypes import RawArray
+
+    series = [np.asarray(prices) for prices in series]
+    if not series:
+        return
+
+    # offsets[i]:offsets[i + 1] is where series i lives in the flat array
+    offsets = np.zeros(len(series) + 1, dtype=np.int64)
+    np.cumsum([len(prices) for prices in series], out=offsets[1:])
+
+    # keep integer prices as integers so results match the list version exactly
+    shared_is_float = RawArray(ctypes.c_bool, len(series))
+    is_float = np.frombuffer(shared_is_float, dtype=np.bool_)
+
+    shared_prices = RawArray(ctypes.c_int64, max(int(offsets[-1]), 1))
+    flat = np.frombuffer(shared_prices, dtype=np.int64)
+    for i, prices in enumerate(series):
+        if np.issubdtype(prices.dtype, np.integer):
+            flat[offsets[i]:offsets[i + 1]] = prices
+        else:
+            is_float[i] = True
+            flat[offsets[i]:offsets[i + 1]].view(np.float64)[:] = prices
+
+    shared_offsets = RawArray(ctypes.c_int64, len(offsets))
+    np.frombuffer(shared_offsets, dtype=np.int64)[:] = offsets
+
+    # free our copies; the workers read from shared memory
+    del series, flat, is_float
+
+    jobs = [(start, min(start + chunk_size, len(offsets) - 1))
+            for start in xrange(0, len(offsets) - 1, chunk_size)]
+
+    pool = multiprocessing.Pool(workers, _init_profit_worker,
+                                (shared_prices, shared_offsets,
+                                 shared_is_float, func))
+    try:
+        for results in pool.imap_unordered(_run_profit_jobs, jobs):
+            for result in results:
+                yield result
+        pool.close()
+    finally:
+        pool.terminate()
+        pool.join()
+
+# Runtime: O(N / workers) for N prices in total, plus one O(N) copy into shared
+# memory
+# Space complexity: O(N) shared across all workers, rather than a copy per task
+
+
+def benchmark_max_profits_parallel(num_series=20000, minutes=390,
+                                   worker_counts=None, chunk_size=256):
+    """Print throughput of iter_max_profits_parallel as workers are added."""
+
+    import multiprocessing
+    import random
+    import time
+
+    if worker_counts is None:
+        worker_counts = [1]
+        while worker_counts[-1] * 2 <= multiprocessing.cpu_count():
+            worker_counts.append(worker_counts[-1] * 2)
+
+    series = [[random.randint(100, 200) for _ in xrange(minutes)]
+              for _ in xrange(num_series)]
+
+    start = time.time()
+    for prices in series:
+        get_max_profit3(prices)
+    baseline = time.time() - start
+    print "%-10s %10.3fs %12.0f series/s" % ('serial', baseline,
+                                             num_series / baseline)
+
+    for workers in worker_counts:
+        start = time.time()
+        for _ in iter_max_profits_parallel(series, workers=workers,
+                                           chunk_size=chunk_size):
+            pass
+        elapsed = time.time() - start
+        print "%-10s %10.3fs %12.0f series/s %6.2fx" % (
+            '%i workers' % workers, elapsed, num_series / elapsed,
+            baseline / elapsed)
+
+
 if __name__ == '__main__':
 
+    import sys
+    if '--bench' in sys.argv:
+        benchmark_max_profits_parallel()
+        sys.exit()
+
     import doctest
     if doctest.testmod().failed == 0:
         print "\n ALL TESTS PASSED!! \n"
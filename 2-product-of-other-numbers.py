@@ -148,10 +148,402 @@ def get_products_of_all_ints_except_at_index4(lst):
 # Handle edge cases:
 # Input list contains zeroes? That's fine.
 # Input list only has one integer? No products to return. Make sure len(lst) > 2.
+# Input list is long? The products grow to thousands of digits, and every
+# multiply gets slower. Use one of the fixed-width modes below instead.
+
+
+# Inclusive prefix products modulo p, as a NumPy scan. np.multiply.accumulate
+# would overflow int64 before we could reduce, so lay the input out as a square-ish
+# grid of blocks: walk the grid so every block is scanned at once, then scan
+# the block totals the same way and multiply each block by the totals before it.
+# Operands are always < p, so p must be small enough that p * p fits in an int64.
+def _scan_products_mod(nums, modulus):
+    import numpy as np
+
+    if len(nums) <= 64:
+        products = nums.copy()
+        for i in xrange(1, len(products)):
+            products[i] = products[i] * products[i - 1] % modulus
+        return products
+
+    width = int(len(nums) ** 0.5) + 1
+    rows = -(-len(nums) // width)
+
+    grid = np.ones(rows * width, dtype=np.int64)
+    grid[:len(nums)] = nums
+
+    # each column of the grid is one block, so every step of the walk touches
+    # a contiguous row
+    grid = grid.reshape(rows, width).T.copy()
+
+    for row in xrange(1, width):
+        np.multiply(grid[row], grid[row - 1], out=grid[row])
+        np.remainder(grid[row], modulus, out=grid[row])
+
+    # product of all blocks before each block
+    carry = np.ones(rows, dtype=np.int64)
+    carry[1:] = _scan_products_mod(grid[-1, :-1], modulus)
+    grid = grid * carry % modulus
+
+    return grid.T.ravel()[:len(nums)]
+
+
+# Exclusive version of the scan: the product of all ints before each index.
+def _prefix_products_mod(nums, modulus):
+    import numpy as np
+
+    products = np.ones(len(nums), dtype=np.int64)
+    products[1:] = _scan_products_mod(nums[:-1], modulus)
+
+    return products
+
+
+# Same as version 4, but with fixed-width arithmetic:
+#   'exact' - Python ints, as in version 4
+#   'mod'   - every product modulo a prime, as a NumPy int64 array
+#   'log'   - (signs, log_abs) NumPy arrays, where each product is
+#             signs[i] * exp(log_abs[i]); a product including a zero has sign 0
+#             and log_abs -inf
+# The prefix/suffix passes run as vectorized scans, and the log mode adds logs
+# instead of dividing the total, so we still don't use division.
+def get_products_of_all_ints_except_at_index5(lst, mode='exact',
+                                              modulus=10 ** 9 + 7):
+    """Return list of integer products except the integer at that index.
+
+    >>> get_products_of_all_ints_except_at_index5([1, 7, 3, 4])
+    [84, 12, 28, 21]
+
+    >>> get_products_of_all_ints_except_at_index5([1, 7, 3, 4], 'mod', 5).tolist()
+    [4, 2, 3, 1]
+
+    >>> signs, logs = get_products_of_all_ints_except_at_index5([1, -7, 0, 4],
+    ...                                                         'log')
+    >>> signs.tolist()
+    [0, 0, -1, 0]
+    >>> import numpy as np
+    >>> np.round(np.exp(logs), 6).tolist()
+    [0.0, 0.0, 28.0, 0.0]
+    """
+
+    if mode == 'exact':
+        return get_products_of_all_ints_except_at_index4(lst)
+
+    import numpy as np
+
+    if mode == 'mod':
+        if not 1 < modulus <= 2 ** 31:
+            raise ValueError('Modulus must fit in 31 bits to multiply in int64')
+
+        nums = np.asarray(lst, dtype=np.int64) % modulus
+
+        # products of all ints before each index, and after each index
+        before = _prefix_products_mod(nums, modulus)
+        after = _prefix_products_mod(nums[::-1], modulus)[::-1]
+
+        return before * after % modulus
+
+    if mode == 'log':
+        nums = np.asarray(lst, dtype=np.float64)
+
+        # log(0) is -inf, which keeps any sum including it at -inf
+        with np.errstate(divide='ignore'):
+            logs = np.log(np.abs(nums))
+        signs = np.sign(nums).astype(np.int8)
+
+        # exclusive prefix and suffix sums of logs, and products of signs
+        log_before = np.zeros(len(nums))
+        log_after = np.zeros(len(nums))
+        np.cumsum(logs[:-1], out=log_before[1:])
+        np.cumsum(logs[:0:-1], out=log_after[-2::-1])
+
+        sign_before = np.ones(len(nums), dtype=np.int8)
+        sign_after = np.ones(len(nums), dtype=np.int8)
+        np.multiply.accumulate(signs[:-1], out=sign_before[1:])
+        np.multiply.accumulate(signs[:0:-1], out=sign_after[-2::-1])
+
+        return sign_before * sign_after, log_before + log_after
+
+    raise ValueError("Mode must be 'exact', 'mod' or 'log'")
+
+# Runtime: O(n), in O(sqrt(n)) NumPy steps for 'mod'
+# Space complexity: O(n)
+
+
+# Parallel approach for huge inputs: split the list into blocks. First, each
+# worker multiplies out one block to get its total. Then, sequentially, the
+# product of every block total before and after each block gives the factor from
+# outside that block. Last, each worker runs version 4 inside its block and
+# multiplies in the outside factor. Workers inherit the input list when the pool
+# forks, so each task is only a (start, end) range.
+_product_input = {}
+
+
+def _init_product_worker(lst, modulus):
+    """Give a pool worker the input list."""
+
+    _product_input['lst'] = lst
+    _product_input['modulus'] = modulus
+
+
+def _get_block_product(block):
+    """Return the product of all ints in lst[start:end]."""
+
+    lst = _product_input['lst']
+    modulus = _product_input['modulus']
+    start, end = block
+
+    product = 1
+    for i in xrange(start, end):
+        product *= lst[i]
+        if modulus:
+            product %= modulus
+
+    return product
+
+
+def _get_block_products_except(block):
+    """Return version 4 over lst[start:end], times the outside factor."""
+
+    lst = _product_input['lst']
+    modulus = _product_input['modulus']
+    start, end, outside = block
+
+    # the outside factor seeds the products before each index
+    products = [None] * (end - start)
+    product = outside
+    for i in xrange(start, end):
+        products[i - start] = product
+        product *= lst[i]
+        if modulus:
+            product %= modulus
+
+    product = 1
+    for i in xrange(end - 1, start - 1, -1):
+        products[i - start] *= product
+        product *= lst[i]
+        if modulus:
+            products[i - start] %= modulus
+            product %= modulus
+
+    return products
+
+
+def get_products_of_all_ints_except_at_index_parallel(lst, blocks=None,
+                                                      workers=None,
+                                                      modulus=None):
+    """Return list of integer products except the integer at that index.
+
+    >>> get_products_of_all_ints_except_at_index_parallel([1, 7, 3, 4, 0, 2],
+    ...                                                   blocks=3, workers=2)
+    [0, 0, 0, 0, 168, 0]
+
+    >>> get_products_of_all_ints_except_at_index_parallel([1, 7, 3, 4],
+    ...                                                   blocks=2, workers=2,
+    ...                                                   modulus=5)
+    [4, 2, 3, 1]
+    """
+
+    import multiprocessing
+
+    if workers is None:
+        workers = multiprocessing.cpu_count()
+    if blocks is None:
+        blocks = workers * 4
+    blocks = max(1, min(blocks, len(lst)))
+
+    # split into blocks of nearly equal size
+    bounds = [len(lst) * b // blocks for b in xrange(blocks + 1)]
+    ranges = zip(bounds[:-1], bounds[1:])
+
+    pool = multiprocessing.Pool(workers, _init_product_worker, (lst, modulus))
+    try:
+        totals = pool.map(_get_block_product, ranges)
+
+        # product of all block totals before each block, then after each block
+        outside = [None] * blocks
+        product = 1
+        for b in xrange(blocks):
+            outside[b] = product
+            product *= totals[b]
+            if modulus:
+                product %= modulus
+
+        product = 1
+        for b in xrange(blocks - 1, -1, -1):
+            outside[b] *= product
+            product *= totals[b]
+            if modulus:
+                outside[b] %= modulus
+                product %= modulus
+
+        products = []
+        for block_products in pool.imap(_get_block_products_except,
+                                        [(start, end, outside[b])
+                                         for b, (start, end) in enumerate(ranges)]):
+            products.extend(block_products)
+        pool.close()
+    finally:
+        pool.terminate()
+        pool.join()
+
+    return products
+
+# Runtime: O(n / workers) for each parallel pass, plus O(blocks) to combine
+# Space complexity: O(n) for the output
+
+
+# Updatable approach: when the list changes one int at a time, keep a segment
+# tree of products, where each node holds the product of its two children.
+# The product of every int except the one at idx is the product of the siblings
+# along the path from idx's leaf up to the root, so we never divide.
+class ProductsExceptIndex(object):
+    """Maintain products of all ints except each index under point updates.
+
+    >>> products = ProductsExceptIndex([1, 7, 3, 4])
+    >>> products.query(0)
+    84
+    >>> products.update(2, 0)
+    >>> products.query(2)
+    28
+    >>> products.query(3)
+    0
+    >>> products.export()
+    [0, 0, 28, 0]
+
+    >>> ProductsExceptIndex([1, 7, 3, 4], modulus=5).export()
+    [4, 2, 3, 1]
+    """
+
+    def __init__(self, lst, modulus=None):
+        self.length = len(lst)
+        self.modulus = modulus
+
+        # round the leaf count up to a power of 2; empty leaves multiply by 1
+        self.size = 1
+        while self.size < self.length:
+            self.size *= 2
+
+        self.tree = [1] * (2 * self.size)
+        for i, num in enumerate(lst):
+            self.tree[self.size + i] = num % modulus if modulus else num
+
+        for node in xrange(self.size - 1, 0, -1):
+            self._pull(node)
+
+    def _pull(self, node):
+        product = self.tree[2 * node] * self.tree[2 * node + 1]
+        if self.modulus:
+            product %= self.modulus
+        self.tree[node] = product
+
+    def update(self, idx, num):
+        """Set the int at idx."""
+
+        if not 0 <= idx < self.length:
+            raise IndexError('Index %i is out of range' % idx)
+
+        node = self.size + idx
+        self.tree[node] = num % self.modulus if self.modulus else num
+
+        # only the ancestors of the leaf need to be rebuilt
+        node //= 2
+        while node:
+            self._pull(node)
+            node //= 2
+
+    def query(self, idx):
+        """Return the product of every int except the one at idx."""
+
+        if not 0 <= idx < self.length:
+            raise IndexError('Index %i is out of range' % idx)
+
+        product = 1
+        node = self.size + idx
+        while node > 1:
+            # node ^ 1 is the sibling covering the other half of the parent
+            product *= self.tree[node ^ 1]
+            if self.modulus:
+                product %= self.modulus
+            node //= 2
+
+        return product
+
+    def export(self):
+        """Return the products for every index, as version 4 would."""
+
+        products = [None] * self.length
+
+        product = 1
+        for i in xrange(self.length):
+            products[i] = product
+            product *= self.tree[self.size + i]
+            if self.modulus:
+                product %= self.modulus
+
+        product = 1
+        for i in xrange(self.length - 1, -1, -1):
+            products[i] *= product
+            product *= self.tree[self.size + i]
+            if self.modulus:
+                products[i] %= self.modulus
+                product %= self.modulus
+
+        return products
+
+# Runtime: O(n) to build; O(log n) per update or query; O(n) to export
+# Space complexity: O(n) for the tree
+
+
+def benchmark_products_parallel(size=2000000, modulus=10 ** 9 + 7,
+                                block_counts=None, worker_counts=None):
+    """Print speedup of the parallel version over version 4."""
+
+    import multiprocessing
+    import random
+    import time
+
+    if worker_counts is None:
+        worker_counts = [1]
+        while worker_counts[-1] * 2 <= multiprocessing.cpu_count():
+            worker_counts.append(worker_counts[-1] * 2)
+    if block_counts is None:
+        block_counts = [1, 4, 16, 64]
+
+    lst = [random.randint(1, modulus - 1) for _ in xrange(size)]
+
+    # version 4 with a modulus, so the baseline isn't dominated by big ints
+    start = time.time()
+    expected = [None] * size
+    product = 1
+    for i in xrange(size):
+        expected[i] = product
+        product = product * lst[i] % modulus
+    product = 1
+    for i in xrange(size - 1, -1, -1):
+        expected[i] = expected[i] * product % modulus
+        product = product * lst[i] % modulus
+    baseline = time.time() - start
+    print "%-22s %10.3fs" % ('sequential', baseline)
+
+    for workers in worker_counts:
+        for blocks in block_counts:
+            start = time.time()
+            products = get_products_of_all_ints_except_at_index_parallel(
+                lst, blocks=blocks, workers=workers, modulus=modulus)
+            elapsed = time.time() - start
+            assert products == expected
+            print "%-22s %10.3fs %6.2fx" % (
+                '%i workers, %i blocks' % (workers, blocks), elapsed,
+                baseline / elapsed)
 
 
 if __name__ == '__main__':
 
+    import sys
+    if '--bench' in sys.argv:
+        benchmark_products_parallel()
+        sys.exit()
+
     import doctest
     if doctest.testmod().failed == 0:
         print "\n ALL TESTS PASSED!! \n"
\ No newline at end of file
@@ -3,6 +3,9 @@
 The input list_of_ints will always have at least three integers.
 """
 
+import collections
+import heapq
+
 # Sort the list to get the highest numbers.
 def get_highest_product(nums):
     """Return the highest product from three ints in a list.
@@ -97,16 +100,255 @@ def get_highest_product3(nums):
 # Handle edge cases:
 # Highest product of 4 items? Highest product of k items?
 # If our highest product is really big, it could overflow
-# def get_highest_product4(nums, k):
+#
+# The best k ints are always some number j of the lowest ints (pairs of
+# negatives) plus the k - j highest ints, so we only need the k lowest and k
+# highest. Keep both in bounded heaps as we walk the input once, then try every
+# split between the two ends.
+def get_highest_product4(nums, k):
     """Return the highest product from 'k' ints in a list.
 
     >>> get_highest_product4([6, 3, 5, 1, 7, 2, 4], 4)
-    210
+    840
 
     >>> get_highest_product4([1, 10, -5, 1, -100, 8, 12, 0], 5)
     480000
+
+    >>> get_highest_product4((num for num in [-4, -3, -2, -1]), 3)
+    -6
+
+    >>> get_highest_product4([1, 10, -5, 1, -100], 3)
+    5000
+    """
+
+    if k < 1:
+        raise ValueError('k must be at least 1')
+
+    # min-heap of the k highest ints, and max-heap (negated) of the k lowest;
+    # the position breaks ties so an int kept in both heaps is only counted once
+    highest = []
+    lowest = []
+    count = 0
+
+    # nums can be any iterable, including a generator
+    for idx, num in enumerate(nums):
+        count += 1
+
+        if len(highest) < k:
+            heapq.heappush(highest, (num, idx))
+        elif num > highest[0][0]:
+            heapq.heapreplace(highest, (num, idx))
+
+        if len(lowest) < k:
+            heapq.heappush(lowest, (-num, idx))
+        elif num < -lowest[0][0]:
+            heapq.heapreplace(lowest, (-num, idx))
+
+    if count < k:
+        raise Exception('Need at least %i ints to calculate' % k)
+
+    # the lowest and highest ints, in sorted order, without duplicates
+    candidates = {}
+    for num, idx in highest:
+        candidates[idx] = num
+    for neg_num, idx in lowest:
+        candidates[idx] = -neg_num
+    candidates = sorted(candidates.values())
+
+    # product of the j lowest candidates, and of the j highest candidates
+    products_low = [1] * (k + 1)
+    products_high = [1] * (k + 1)
+    for j in xrange(1, k + 1):
+        products_low[j] = products_low[j - 1] * candidates[j - 1]
+        products_high[j] = products_high[j - 1] * candidates[-j]
+
+    return max(products_low[j] * products_high[k - j] for j in xrange(k + 1))
+
+# Runtime: O(n log k) for the heaps, plus O(k log k) to sort the candidates
+# Space: O(k), since we never hold more than 2k ints
+
+
+# Batched approach for many independent rows of a NumPy array. Like version 2,
+# the answer is either the 3 highest ints or the 2 lowest ints times the highest,
+# but we only need those 5 ints, not a full sort. np.partition pulls them out in
+# O(n) per row and works on a copy, so the caller's array is never touched. To
+# keep that copy small, work through the rows a chunk at a time. Products are
+# computed in int64 (or float64 for floats) whatever the input's dtype, and a
+# product of three ints below 2^21 in size always fits. If any int is bigger, we
+# multiply Python ints in an object array instead, so the result is still exact.
+INT64_SAFE_FACTOR = 1 << 21
+
+
+def get_highest_product_batch(nums, chunk_rows=4096):
+    """Return the highest product from three ints in each row of a 2-D array.
+
+    >>> import numpy as np
+    >>> nums = np.array([[6, 3, 5, 1, 7, 2, 4],
+    ...                  [1, 10, -5, 1, -100, 0, 0],
+    ...                  [-1, -2, -3, -4, -5, -6, -7]])
+    >>> get_highest_product_batch(nums).tolist()
+    [210, 5000, -6]
+    >>> nums[0].tolist()
+    [6, 3, 5, 1, 7, 2, 4]
+    >>> get_highest_product_batch(np.array([[2000, 1500, 1800, 3]],
+    ...                                    dtype=np.int32)).tolist()
+    [5400000000]
+    """
+
+    import numpy as np
+
+    nums = np.atleast_2d(np.asarray(nums))
+    rows, length = nums.shape
+
+    if length < 3:
+        raise Exception('Need at least three ints to calculate')
+
+    if nums.dtype.kind in 'biu':
+        fits = nums.size == 0 or (nums.max() < INT64_SAFE_FACTOR and
+                                  nums.min() > -INT64_SAFE_FACTOR)
+        dtype = np.int64 if fits else object
+    else:
+        dtype = np.result_type(nums.dtype, np.int64)
+
+    products = np.empty(rows, dtype=dtype)
+
+    for start in xrange(0, rows, chunk_rows):
+        chunk = nums[start:start + chunk_rows]
+
+        # partition around the 2nd lowest and 3rd highest positions at once:
+        # everything left of index 2 is among the 2 lowest, and everything
+        # right of index length - 3 is among the 3 highest
+        parts = np.partition(chunk, [1, length - 3], axis=1)
+        lowest = parts[:, :2].astype(dtype)
+        highest = np.sort(parts[:, -3:], axis=1).astype(dtype)
+
+        highest_three = highest[:, 0] * highest[:, 1] * highest[:, 2]
+        lowest_pair = lowest[:, 0] * lowest[:, 1] * highest[:, 2]
+
+        products[start:start + chunk_rows] = np.maximum(highest_three,
+                                                        lowest_pair)
+
+    return products
+
+# Runtime: O(r*n) for r rows of n ints, vectorized
+# Space: O(chunk_rows * n) for the partitioned copy of one chunk
+# Note: products of ints are exact, but rows with an int of 2^21 or more are
+# multiplied as Python ints, which is several times slower than int64
+
+
+# Sliding window approach: we want the highest product of three over only the
+# last W readings (or the readings from the last W seconds), updated every tick.
+# As in version 2, we only ever need the 3 highest and 2 lowest readings, so keep
+# a max-heap and a min-heap of the readings in the window. Rather than searching
+# a heap to remove a reading when it expires, leave it there and skip it when it
+# reaches the top (lazy deletion). Rebuild the heaps from the live readings
+# whenever expired ones make up more than half, so memory stays O(W).
+class WindowedHighestProduct(object):
+    """Track the highest product of three ints within a sliding window.
+
+    >>> tracker = WindowedHighestProduct(size=4)
+    >>> for num in [1, 10, -5, 1]:
+    ...     tracker.insert(num)
+    >>> tracker.get_highest_product()
+    10
+    >>> tracker.insert(-100)
+    >>> tracker.get_highest_product()
+    5000
+    >>> tracker.insert(2)
+    >>> tracker.get_highest_product()
+    1000
+
+    >>> tracker = WindowedHighestProduct(duration=60)
+    >>> tracker.insert(6, timestamp=0)
+    >>> tracker.insert(5, timestamp=30)
+    >>> tracker.insert(4, timestamp=50)
+    >>> tracker.insert(3, timestamp=65)
+    >>> tracker.get_highest_product()
+    60
+    >>> tracker.insert(2, timestamp=95)
+    >>> tracker.get_highest_product()
+    24
     """
 
+    def __init__(self, size=None, duration=None):
+        if (size is None) == (duration is None):
+            raise ValueError('Window needs exactly one of size or duration')
+
+        self.size = size
+        self.duration = duration
+
+        # live readings in arrival order, as (seq, timestamp, num)
+        self.window = collections.deque()
+        self.seq = 0
+
+        # (-num, seq) so the highest reading is on top; (num, seq) for lowest
+        self.highest = []
+        self.lowest = []
+
+    def insert(self, num, timestamp=None):
+        """Record a new reading; expire readings that left the window."""
+
+        if self.duration is not None:
+            if timestamp is None:
+                raise ValueError('Time-based windows need a timestamp')
+            if self.window and timestamp < self.window[-1][1]:
+                raise ValueError('Timestamps must not go backwards')
+
+        self.window.append((self.seq, timestamp, num))
+        heapq.heappush(self.highest, (-num, self.seq))
+        heapq.heappush(self.lowest, (num, self.seq))
+        self.seq += 1
+
+        # expire from the front of the window
+        if self.size is not None:
+            while len(self.window) > self.size:
+                self.window.popleft()
+        else:
+            while self.window[0][1] <= timestamp - self.duration:
+                self.window.popleft()
+
+        # drop expired readings buried in the heaps once they take up too much
+        if len(self.highest) > 2 * len(self.window) + 16:
+            self.highest = [(-num, seq) for seq, _, num in self.window]
+            self.lowest = [(num, seq) for seq, _, num in self.window]
+            heapq.heapify(self.highest)
+            heapq.heapify(self.lowest)
+
+    def _top(self, heap, count):
+        """Return the first count live entries of a heap, leaving them in it."""
+
+        oldest = self.window[0][0]
+        entries = []
+
+        while len(entries) < count:
+            entry = heapq.heappop(heap)
+
+            # expired readings are discarded for good
+            if entry[1] >= oldest:
+                entries.append(entry)
+
+        for entry in entries:
+            heapq.heappush(heap, entry)
+
+        return entries
+
+    def get_highest_product(self):
+        """Return the highest product from three ints in the window."""
+
+        if len(self.window) < 3:
+            raise Exception('Need at least three ints to calculate')
+
+        highest = [-num for num, _ in self._top(self.highest, 3)]
+        lowest = [num for num, _ in self._top(self.lowest, 2)]
+
+        # compare the 3 highest against the 2 lowest (possibly negative) times
+        # the highest
+        return max(highest[0] * highest[1] * highest[2],
+                   lowest[0] * lowest[1] * highest[0])
+
+# Runtime: amortized O(log W) per insert and per query
+# Space: O(W) for the window and the two heaps
+
 
 if __name__ == '__main__':
 
@@ -31,6 +31,12 @@ very large numbers, like Unix timestamps. In any case, the spirit of the challen
 is to merge meetings where start_time and end_time don't have an upper bound.
 """
 
+import bisect
+import heapq
+import os
+import struct
+import tempfile
+
 def condense_meeting_times(mtgs):
     """Return a list of condensed meeting ranges.
 
@@ -72,8 +78,543 @@ def condense_meeting_times(mtgs):
 # an identical list to the input list.
 
 
+# Incremental approach: when meetings are added one at a time, don't re-sort
+# and re-merge everything after each one. Keep the condensed ranges sorted, in
+# parallel lists of starts and ends so we can binary search them, and keep the
+# meetings that make up each condensed range. A new meeting only merges with
+# the contiguous run of ranges it overlaps. Deleting a meeting only re-merges the
+# meetings of the one range it belonged to, which may split it apart.
+class MeetingIndex(object):
+    """Keep a condensed list of meeting ranges under inserts and deletes.
+
+    >>> index = MeetingIndex([(0, 1), (3, 5), (4, 8), (10, 12)])
+    >>> index.get_condensed()
+    [(0, 1), (3, 8), (10, 12)]
+    >>> index.insert((9, 10))
+    >>> index.get_condensed()
+    [(0, 1), (3, 8), (9, 12)]
+    >>> index.delete((4, 8))
+    >>> index.get_condensed()
+    [(0, 1), (3, 5), (9, 12)]
+    >>> index.delete((9, 10))
+    >>> index.get_condensed()
+    [(0, 1), (3, 5), (10, 12)]
+    """
+
+    def __init__(self, mtgs=None):
+        self.starts = []
+        self.ends = []
+
+        # condensed ranges as tuples, ready to hand out as they are
+        self.merged = []
+
+        # sorted meetings that make up each condensed range
+        self.mtgs = []
+
+        for mtg in mtgs or []:
+            self.insert(mtg)
+
+    def insert(self, mtg):
+        """Add a meeting, merging it with any ranges it overlaps."""
+
+        start, end = mtg
+
+        # ranges first to last that overlap, using the same rule as
+        # condense_meeting_times: a range that ends when the next starts merges
+        first = bisect.bisect_left(self.ends, start)
+        last = bisect.bisect_right(self.starts, end)
+
+        # inside a single range: add it to that range's meetings in place
+        if last - first == 1:
+            bisect.insort(self.mtgs[first], mtg)
+            if start < self.starts[first] or end > self.ends[first]:
+                start = min(start, self.starts[first])
+                end = max(end, self.ends[first])
+                self.starts[first] = start
+                self.ends[first] = end
+                self.merged[first] = (start, end)
+            return
+
+        mtgs = []
+        for block in self.mtgs[first:last]:
+            mtgs.extend(block)
+        bisect.insort(mtgs, mtg)
+
+        if first < last:
+            start = min(start, self.starts[first])
+            end = max(end, self.ends[last - 1])
+
+        self._replace(first, last, [(start, end)], [mtgs])
+
+    def delete(self, mtg):
+        """Remove a meeting, splitting its range if it no longer holds."""
+
+        start, end = mtg
+
+        # the range containing the meeting is the last to start at or before it
+        idx = bisect.bisect_right(self.starts, start) - 1
+        mtgs = self.mtgs[idx] if idx >= 0 else []
+        pos = bisect.bisect_left(mtgs, mtg)
+
+        if pos == len(mtgs) or mtgs[pos] != mtg:
+            raise ValueError('Meeting %r is not in the index' % (mtg,))
+
+        mtgs = mtgs[:pos] + mtgs[pos + 1:]
+
+        # the rest are still sorted, so re-merge them in one pass
+        merged = []
+        blocks = []
+        for current_start, current_end in mtgs:
+            if merged and current_start <= merged[-1][1]:
+                merged_start, merged_end = merged[-1]
+                merged[-1] = (merged_start, max(merged_end, current_end))
+                blocks[-1].append((current_start, current_end))
+            else:
+                merged.append((current_start, current_end))
+                blocks.append([(current_start, current_end)])
+
+        self._replace(idx, idx + 1, merged, blocks)
+
+    def _replace(self, first, last, merged, blocks):
+        """Swap ranges first to last for new condensed ranges."""
+
+        self.starts[first:last] = [start for start, _ in merged]
+        self.ends[first:last] = [end for _, end in merged]
+        self.merged[first:last] = merged
+        self.mtgs[first:last] = blocks
+
+    def get_condensed(self):
+        """Return the condensed ranges; don't modify the returned list."""
+
+        return self.merged
+
+# Runtime: O(log n + log k) comparisons per insert into a single range, where k
+# is the number of meetings in it (plus the memmove insort does); O(log n + k)
+# for an insert that merges ranges, where k is the meetings in all of them, and
+# for a delete, which copies and re-merges the k meetings of its range (plus
+# shifting the lists either way); O(1) to get_condensed
+# Space: O(n) to keep every meeting
+
+
+# Out-of-core approach for more ranges than fit in memory, like billions of
+# Unix timestamp ranges. An external merge sort: read the ranges in runs of
+# run_size, condense each run in memory, and write it to a temporary file as
+# flat pairs of int64s (16 bytes per range, rather than pickled tuples). Runs
+# are closed once written, so only the runs being merged hold a file open. Then
+# k-way merge the sorted runs with a heap, at most max_open_runs at a time:
+# while there are more runs than that, merge them in batches into new, longer
+# runs, and condense the last merge on the fly, so ranges that overlap across
+# runs still get merged. Each merge splits merge_memory between its readers'
+# buffers, so peak memory is about run_size ranges while writing runs and
+# merge_memory bytes while merging them, however many runs there are.
+RANGE = struct.Struct('<qq')
+
+# rough bytes a range takes once read into a buffer: its 16 bytes of data, plus
+# two unpacked ints and their slots in the unpacked tuple
+RANGE_MEMORY = 80
+
+
+def write_ranges(ranges, f):
+    """Write (start, end) ranges to a binary file as int64 pairs."""
+
+    f.writelines(RANGE.pack(start, end) for start, end in ranges)
+
+
+def iter_ranges(f, buffer_size=1 << 16):
+    """Yield (start, end) ranges from a binary file of int64 pairs."""
+
+    while True:
+        data = f.read(RANGE.size * buffer_size)
+        count = len(data) // RANGE.size
+
+        # unpack the whole buffer at once, then pair up starts and ends
+        flat = struct.unpack('<%iq' % (2 * count), data[:RANGE.size * count])
+        for i in xrange(0, len(flat), 2):
+            yield flat[i], flat[i + 1]
+
+        if count < buffer_size:
+            return
+
+
+def _condense_sorted(mtgs):
+    """Yield condensed ranges from a stream of sorted ranges."""
+
+    merged_start = merged_end = None
+
+    for current_start, current_end in mtgs:
+        if merged_start is not None and current_start <= merged_end:
+            merged_end = max(merged_end, current_end)
+        else:
+            if merged_start is not None:
+                yield merged_start, merged_end
+            merged_start, merged_end = current_start, current_end
+
+    if merged_start is not None:
+        yield merged_start, merged_end
+
+
+def condense_meeting_times_external(mtgs, run_size=1 << 20, max_open_runs=64,
+                                    merge_memory=1 << 26, tmp_dir=None):
+    """Yield condensed meeting ranges, sorting runs out of memory.
+
+    >>> list(condense_meeting_times_external([(0, 1), (3, 5), (4, 8), (10, 12),
+    ...                                       (9, 10), (13, 14), (2, 3)],
+    ...                                      run_size=2, max_open_runs=2,
+    ...                                      merge_memory=1))
+    [(0, 1), (2, 8), (9, 12), (13, 14)]
+    """
+
+    if max_open_runs < 2:
+        raise ValueError('max_open_runs must be at least 2')
+
+    runs = []
+    try:
+        run = []
+        for mtg in mtgs:
+            run.append(mtg)
+            if len(run) == run_size:
+                runs.append(_write_run(run, tmp_dir))
+                run = []
+
+        # everything fit in one run, so there's nothing to merge from disk
+        if not runs:
+            run.sort()
+            for mtg in _condense_sorted(run):
+                yield mtg
+            return
+
+        if run:
+            runs.append(_write_run(run, tmp_dir))
+        del run
+
+        # merge batches of runs into longer runs until one merge takes the rest
+        while len(runs) > max_open_runs:
+            merged_runs = []
+            for i in xrange(0, len(runs), max_open_runs):
+                batch = runs[i:i + max_open_runs]
+                merged_runs.append(_merge_runs(batch, merge_memory, tmp_dir))
+                for path in batch:
+                    os.remove(path)
+            runs = merged_runs
+
+        files = []
+        try:
+            for path in runs:
+                files.append(open(path, 'rb'))
+            buffer_size = _buffer_size(merge_memory, len(files))
+            readers = [iter_ranges(f, buffer_size) for f in files]
+            for mtg in _condense_sorted(heapq.merge(*readers)):
+                yield mtg
+        finally:
+            for f in files:
+                f.close()
+
+    finally:
+        for path in runs:
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def _buffer_size(merge_memory, readers):
+    """Return how many ranges each reader can buffer within merge_memory."""
+
+    return max(1, merge_memory // (readers * RANGE_MEMORY))
+
+
+def _new_run(tmp_dir):
+    """Return (path, file) for a new temp file to write a run to."""
+
+    fd, path = tempfile.mkstemp(suffix='.ranges', dir=tmp_dir)
+    return path, os.fdopen(fd, 'wb')
+
+
+def _write_run(run, tmp_dir):
+    """Sort, condense and write a run to a temp file; return its path."""
+
+    run.sort()
+
+    path, f = _new_run(tmp_dir)
+    with f:
+        write_ranges(_condense_sorted(run), f)
+
+    return path
+
+
+def _merge_runs(paths, merge_memory, tmp_dir):
+    """Merge and condense sorted runs into a new run; return its path."""
+
+    files = []
+    try:
+        for path in paths:
+            files.append(open(path, 'rb'))
+        buffer_size = _buffer_size(merge_memory, len(files))
+        readers = [iter_ranges(f, buffer_size) for f in files]
+
+        merged_path, out = _new_run(tmp_dir)
+        with out:
+            write_ranges(_condense_sorted(heapq.merge(*readers)), out)
+    finally:
+        for f in files:
+            f.close()
+
+    return merged_path
+
+# Runtime: O(n log n) to sort the runs, plus O(n log r) to merge r runs, over
+# O(log r / log max_open_runs) passes
+# Space: O(run_size) while writing runs; O(merge_memory) while merging, with at
+# most max_open_runs + 1 files open at once
+
+
+# Back to the original feature: the times in a day when everyone is available.
+# Condense everyone's meetings once, and the free times are the gaps between
+# the condensed ranges (plus everything before the first and after the last).
+# Each gap starts where a range ends, so both lists are already sorted and any
+# query is a binary search. To find the next gap that's long enough, keep the
+# gap lengths in a max segment tree and walk down to the first one that fits.
+class Availability(object):
+    """Answer free-time queries over everyone's condensed meetings.
+
+    >>> free = Availability([(0, 1), (3, 5), (4, 8), (10, 12), (9, 10)])
+    >>> free.is_free(1, 3)
+    True
+    >>> free.is_free(1, 4)
+    False
+    >>> free.next_free_slot(0, 2)
+    1
+    >>> free.next_free_slot(2, 2)
+    12
+    >>> free.next_free_slot(8, 1)
+    8
+    >>> free.is_free_many([(1, 3), (8, 9), (8, 10)])
+    [True, True, False]
+    >>> free.next_free_slot_many([(0, 2), (2, 2), (13, 100)])
+    [1, 12, 13]
+    """
+
+    def __init__(self, mtgs):
+        # copy first, since condense_meeting_times sorts in place
+        merged = condense_meeting_times(list(mtgs)) if mtgs else []
+
+        # gap i is free from gap_starts[i] up to gap_ends[i]
+        self.gap_starts = [float('-inf')] + [end for _, end in merged]
+        self.gap_ends = [start for start, _ in merged] + [float('inf')]
+
+        self.size = 1
+        while self.size < len(self.gap_starts):
+            self.size *= 2
+
+        # max gap length in each node's range; empty leaves can't fit anything
+        self.longest = [float('-inf')] * (2 * self.size)
+        for i, (start, end) in enumerate(zip(self.gap_starts, self.gap_ends)):
+            self.longest[self.size + i] = end - start
+        for node in xrange(self.size - 1, 0, -1):
+            self.longest[node] = max(self.longest[2 * node],
+                                     self.longest[2 * node + 1])
+
+    def _find_gap(self, time):
+        """Return the index of the last gap starting at or before time."""
+
+        return bisect.bisect_right(self.gap_starts, time) - 1
+
+    def _first_gap_at_least(self, idx, length, node=1, lo=0, hi=None):
+        """Return the first gap at or after idx that's at least length long."""
+
+        if hi is None:
+            hi = self.size
+
+        # nothing in this node is far enough along, or long enough
+        if hi <= idx or self.longest[node] < length:
+            return None
+
+        if hi - lo == 1:
+            return lo
+
+        mid = (lo + hi) // 2
+        found = self._first_gap_at_least(idx, length, 2 * node, lo, mid)
+        if found is None:
+            found = self._first_gap_at_least(idx, length, 2 * node + 1, mid, hi)
+
+        return found
+
+    def is_free(self, start, end):
+        """Return whether nobody has a meeting between start and end."""
+
+        if start >= end:
+            raise ValueError('A time range must start before it ends')
+
+        # the range is free if it fits in the gap it starts in
+        return end <= self.gap_ends[self._find_gap(start)]
+
+    def next_free_slot(self, time, length):
+        """Return the earliest start at or after time of a free slot."""
+
+        if length <= 0:
+            raise ValueError('A free slot must have a positive length')
+
+        idx = self._find_gap(time)
+        if time + length <= self.gap_ends[idx]:
+            return time
+
+        # the gap after the last meeting is endless, so something always fits
+        return self.gap_starts[self._first_gap_at_least(idx + 1, length)]
+
+    def is_free_many(self, ranges):
+        """Return is_free for each (start, end) range."""
+
+        return [self.is_free(start, end) for start, end in ranges]
+
+    def next_free_slot_many(self, queries):
+        """Return next_free_slot for each (time, length) query."""
+
+        return [self.next_free_slot(time, length) for time, length in queries]
+
+# Runtime: O(n log n) to condense and build once; O(log n) per query
+# Space: O(n) for the gaps and the segment tree
+
+
+# Vectorized approach for millions of ranges held as int64 arrays rather than
+# lists of tuples. Same steps as condense_meeting_times, as whole-array NumPy
+# operations: sort by start, take the running max of the end times, and a new
+# condensed range starts wherever a meeting starts after everything before it
+# has ended (current_start > merged_end; starting exactly at it still merges).
+def condense_meeting_times_arrays(starts, ends):
+    """Return (starts, ends) arrays of condensed meeting ranges.
+
+    >>> starts, ends = condense_meeting_times_arrays([0, 3, 4, 10, 9],
+    ...                                              [1, 5, 8, 12, 10])
+    >>> zip(starts.tolist(), ends.tolist())
+    [(0, 1), (3, 8), (9, 12)]
+    """
+
+    import numpy as np
+
+    starts = np.asarray(starts, dtype=np.int64)
+    ends = np.asarray(ends, dtype=np.int64)
+
+    if len(starts) == 0:
+        return starts.copy(), ends.copy()
+
+    order = np.argsort(starts, kind='mergesort')
+    starts = starts[order]
+    merged_ends = np.maximum.accumulate(ends[order])
+
+    # breaks[i] is True where meeting i starts a new condensed range
+    breaks = np.empty(len(starts), dtype=bool)
+    breaks[0] = True
+    np.greater(starts[1:], merged_ends[:-1], out=breaks[1:])
+
+    # each range ends with the running max just before the next range starts
+    first = np.flatnonzero(breaks)
+    last = np.append(first[1:] - 1, len(starts) - 1)
+
+    return starts[first], merged_ends[last]
+
+# Runtime: O(n log n) for the sort, then O(n) vectorized
+# Space: O(n)
+
+
+def benchmark_condense_arrays(size=1000000, span=10 ** 9):
+    """Print the time to condense the same ranges as tuples and as arrays."""
+
+    import time
+    import numpy as np
+
+    starts = np.random.randint(0, span, size=size).astype(np.int64)
+    ends = starts + np.random.randint(1, span // size * 4, size=size)
+    mtgs = zip(starts.tolist(), ends.tolist())
+
+    start = time.time()
+    expected = condense_meeting_times(mtgs)
+    baseline = time.time() - start
+    print "%-10s %10.3fs" % ('tuples', baseline)
+
+    start = time.time()
+    merged_starts, merged_ends = condense_meeting_times_arrays(starts, ends)
+    elapsed = time.time() - start
+    print "%-10s %10.3fs %6.2fx" % ('arrays', elapsed, baseline / elapsed)
+
+    assert zip(merged_starts.tolist(), merged_ends.tolist()) == expected
+
+
+# Parallel approach for hundreds of millions of ranges: split the ranges into
+# shards by start time, so every meeting in shard i starts before every meeting
+# in shard i + 1, and condense each shard on its own worker. Shard outputs are
+# then sorted end to end, and only ranges near the shard boundaries can still
+# overlap, so one sequential pass with the same merge rule stitches them
+# together. Shard boundaries come from a sample of start times so the shards
+# are about the same size, and workers inherit the shards when the pool forks.
+_shards = []
+
+
+def _init_shard_worker(shards):
+    """Give a pool worker the shards of meetings."""
+
+    _shards[:] = shards
+
+
+def _condense_shard(idx):
+    """Condense one shard of meetings."""
+
+    shard = _shards[idx]
+    return condense_meeting_times(shard) if shard else []
+
+
+def condense_meeting_times_parallel(mtgs, workers=None, shards=None,
+                                    min_shard_size=100000):
+    """Return a list of condensed meeting ranges, condensing shards in parallel.
+
+    >>> condense_meeting_times_parallel([(0, 1), (3, 5), (4, 8), (10, 12),
+    ...                                  (9, 10)], workers=2, shards=3)
+    [(0, 1), (3, 8), (9, 12)]
+    """
+
+    import multiprocessing
+    import random
+
+    if workers is None:
+        workers = multiprocessing.cpu_count()
+
+    # one shard per worker, unless there's too little work to go around
+    if shards is None:
+        shards = min(workers, len(mtgs) // min_shard_size)
+    shards = max(1, min(shards, len(mtgs)))
+
+    if shards == 1:
+        return condense_meeting_times(list(mtgs)) if mtgs else []
+
+    # split points between shards, from evenly spaced samples of start times
+    sample = sorted(start for start, _ in
+                    random.sample(mtgs, min(len(mtgs), shards * 100)))
+    bounds = [sample[len(sample) * i // shards] for i in xrange(1, shards)]
+
+    parts = [[] for _ in xrange(shards)]
+    for mtg in mtgs:
+        parts[bisect.bisect_right(bounds, mtg[0])].append(mtg)
+
+    pool = multiprocessing.Pool(min(workers, shards), _init_shard_worker,
+                                (parts,))
+    try:
+        condensed = pool.map(_condense_shard, xrange(shards))
+        pool.close()
+    finally:
+        pool.terminate()
+        pool.join()
+
+    # stitch ranges that cross shard boundaries
+    return list(_condense_sorted(mtg for shard in condensed for mtg in shard))
+
+# Runtime: O((n log n) / workers) to condense the shards, plus O(n) to split
+# and stitch them
+# Space: O(n)
+
+
 if __name__ == '__main__':
 
+    import sys
+    if '--bench' in sys.argv:
+        benchmark_condense_arrays()
+        sys.exit()
+
     import doctest
     if doctest.testmod().failed == 0:
         print "\n ALL TESTS PASSED!! \n"
\ No newline at end of file
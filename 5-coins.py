@@ -20,6 +20,10 @@ would output 4 - the number of ways to make 4c with those denominations:
   4. 2c, 2c
 """
 
+import collections
+import sys
+import threading
+
 # Recursive, top-down approach.
 # Starts with final value for amt and recursively breaks the rest of the problems
 # into subproblems with smaller values for amt.
@@ -63,60 +67,166 @@ def make_change(amt_left, denominations, index = 0):
 # instance variable self.memo that maps inputs to outputs.
 
 
-# Recursive, top-down approach using memoization.
-class Change:
+# An LRU cache of tables, keyed by a tuple of denominations and guarded by a lock
+# so threads can share it. The counts are ints that grow with the amount, so the
+# cap is on the bytes the tables hold, as estimated with sys.getsizeof by whoever
+# puts them in, rather than on how many counts there are.
+class _TableCache(object):
+    """Keep the most recently used tables, up to max_bytes in total."""
 
-    def __init__(self):
-        self.memo = {}
+    def __init__(self, max_bytes):
+        self.tables = collections.OrderedDict()
+        self.sizes = {}
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.lock = threading.Lock()
 
-    def make_change2(self, amt_left, denominations, index = 0):
-        """Return the number of ways to make amt with coins of specific denominations.
+    def get(self, key):
+        """Return the table for key, or None; mark it recently used."""
 
-        >>> make_change2(4, [1,2,3])
-        4
+        with self.lock:
+            table = self.tables.pop(key, None)
+
+            # move the table to the most recently used end
+            if table is not None:
+                self.tables[key] = table
+
+            return table
+
+    def put(self, key, table, nbytes):
+        """Cache a table of about nbytes, evicting the least recently used.
+
+        Putting a table that's already cached updates its size. Return the
+        table that's cached for key now.
         """
 
-        # check self.memo to see if we've already made this calculation
-        if (amt_left, index) in self.memo:
+        with self.lock:
+            old = self.tables.pop(key, None)
+            if old is not None:
+                old_nbytes = self.sizes.pop(key)
+                self.size -= old_nbytes
+
+                # another thread may have cached a bigger table meanwhile
+                if old is not table and old_nbytes >= nbytes:
+                    table, nbytes = old, old_nbytes
+
+            # a table bigger than the whole cache isn't worth evicting everything
+            # for; keep the smaller one we had, unless it was this table
+            if nbytes > self.max_bytes:
+                if old is not None and old is not table:
+                    self.tables[key] = old
+                    self.sizes[key] = old_nbytes
+                    self.size += old_nbytes
+                return table
+
+            self.tables[key] = table
+            self.sizes[key] = nbytes
+            self.size += nbytes
+
+            while self.size > self.max_bytes:
+                evicted, _ = self.tables.popitem(last=False)
+                self.size -= self.sizes.pop(evicted)
+
+            return table
+
+
+# Memoized approach that can be shared by many requests.
+# Every call fills in a call-local table bottom-up, like make_change3 below, so
+# a single call is always O(n*m) and never recurses. The finished table is then
+# memoized per set of denominations, so any later call with the same coins and an
+# amount the table covers is a lookup. The memo is a _TableCache capped at about
+# max_bytes of tables; evicting a table only costs a later cache hit, never extra
+# complexity.
+class Change(object):
+    """Count ways to make change, caching tables across calls.
+
+    >>> change = Change()
+    >>> change.make_change2(4, [1, 2, 3])
+    4
+    >>> hits = change.get_stats()['hits']
+    >>> change.make_change2(3, [1, 2, 3])
+    3
+    >>> change.get_stats()['hits'] - hits
+    1
+    >>> change.make_change2(5000, [1, 2, 5, 10, 25, 50])
+    218179808726
+    >>> Change(max_bytes=1000).make_change2(5000, [1, 2, 5, 10, 25, 50])
+    218179808726
+    """
+
+    def __init__(self, max_bytes=64 << 20):
+        # maps a tuple of denominations to its ways_of_making_n_cents table
+        self.memo = _TableCache(max_bytes)
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def _get(self, denominations, amt):
+        """Return the memoized count for amt, or None."""
+
+        table = self.memo.get(denominations)
+        hit = table is not None and amt < len(table)
+
+        with self.lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
 
-            print "grabbing memo[%i %i]" % amt_left, index
+        return table[amt] if hit else None
 
-            return memo[(amt_left, index)]
+    def _set(self, denominations, table):
+        """Memoize a table, sized by its list and every count in it."""
 
-        # base case: we hit the right amount
-        if amt_left == 0: return 1
+        nbytes = sys.getsizeof(table) + sum(sys.getsizeof(count)
+                                            for count in table)
+        self.memo.put(denominations, table, nbytes)
+
+    def make_change2(self, amt_left, denominations, index = 0):
+        """Return the number of ways to make amt with coins of specific denominations.
+
+        >>> Change().make_change2(4, [1,2,3])
+        4
+        """
 
         # base case: we overshot the amount by using too many coins
-        if amt_left < 0: return 0
+        if amt_left < 0:
+            return 0
 
-        # base case: we've used all possible denominations
-        if index == len(denominations): return 0
+        # only the coins from index onward can be used; hash them once per call
+        denominations = tuple(denominations[index:])
 
-        # print "checking ways to make %i with %s" % (amt_left, denominations[index:])
+        # check self.memo to see if we've already made this calculation
+        counter = self._get(denominations, amt_left)
+        if counter is not None:
+            return counter
 
-        # choose current coin
-        coin = denominations[index]
+        # otherwise build a call-local table, bottom-up
+        ways_of_making_n_cents = [0] * (amt_left + 1)
+        ways_of_making_n_cents[0] = 1
 
-        # initialize the counter
-        counter = 0
+        for coin in denominations:
+            for value in xrange(coin, amt_left + 1):
+                ways_of_making_n_cents[value] += ways_of_making_n_cents[value - coin]
 
-        # count the possibilities for each combination using the current coin
-        while amt_left >= 0:
-            counter += make_change(amt_left, denominations, index + 1)
-            amt_left -= coin
+        # save the finished table to self.memo
+        self._set(denominations, ways_of_making_n_cents)
 
+        return ways_of_making_n_cents[amt_left]
 
-        # if not in self.memo, save the results of any calculation to self.memo
-        self.memo[(amt_left, index)] = counter
-        
-        return counter
+    def get_stats(self):
+        """Return the memo's hits, misses and estimated size in bytes."""
 
-# Runtime: O(n*m)
-# Space: O(n*m) for self.memo; O(m) for the call stack
+        with self.lock:
+            return {'hits': self.hits,
+                    'misses': self.misses,
+                    'size': self.memo.size}
+
+# Runtime: O(n*m) on a miss; O(m) on a hit, to hash the denominations
+# Space: O(n) for the call-local table; the memo holds about max_bytes at most
 # In each case, n is the size of amt_left and m is the num of items in denominations
-# Becase the function is recursive, it will build up a large call stack as a new
-# frame gets pushed onto the call stack each time the function calls itself; if
-# the stack has limited amount of space before you encounter a stack overflow error.
+# Since we build the table iteratively instead of recursing, a large amount can't
+# hit a stack overflow error.
 
 
 # Bottom-up, iterative approach.
@@ -165,6 +275,439 @@ def make_change3(amt, denominations):
 # Space: O(n), where n is the size of amt.
 
 
+# Reusable tables: make_change3 starts over for every amount, but a pricing
+# service asks about many amounts with the same few denominations. Keep the
+# table for each set of denominations, and grow it when a bigger amount comes in.
+# To grow it, flip make_change3's loops: for each new value, add the coins one at
+# a time. Adding coin j at value needs the ways to make value - coin using coins
+# j onward, so keep a column of counts for each coin. We add the coins from last
+# to first, so columns[j] counts the ways using only coins j onward; the order
+# doesn't change the totals in columns[0], and it lets us enumerate combinations
+# from the first coin and skip any branch whose remainder has no ways to finish.
+# In the same pass, keep the fewest coins for each value, and the last coin of
+# that solution, so we can read the breakdown back. Threads can share a table:
+# growing it takes a lock, and fewest_coins is appended last, so any amount
+# below its length is finished in every list and can be read without one.
+class ChangeTable(object):
+    """Answer ways to make any amount with one set of denominations.
+
+    >>> table = ChangeTable([1, 2, 3])
+    >>> table.query(4)
+    4
+    >>> len(table.ways_of_making_n_cents)
+    5
+    >>> table.query_many([4, 10, 0])
+    [4, 14, 1]
+    >>> len(table.ways_of_making_n_cents)
+    11
+    >>> list(table.iter_combinations(4))
+    [(1, 1, 1, 1), (1, 1, 2), (1, 3), (2, 2)]
+    >>> table.get_fewest_coins(10)
+    [1, 3, 3, 3]
+    """
+
+    def __init__(self, denominations):
+        if any(coin <= 0 for coin in denominations):
+            raise ValueError('Denominations must be positive')
+
+        self.denominations = tuple(denominations)
+
+        # columns[j][k] is how many ways we can get to k cents with coins j onward
+        self.columns = [[] for _ in self.denominations]
+
+        # ways_of_making_n_cents[k] is how many ways we can get to k cents
+        self.ways_of_making_n_cents = []
+
+        # fewest_coins[k] is the fewest coins that make k cents, or None if no
+        # coins can; last_coins[k] is a coin in that solution
+        self.fewest_coins = []
+        self.last_coins = []
+
+        # rough bytes the lists hold, for _TableCache
+        self.nbytes = 0
+
+        self.lock = threading.Lock()
+
+    def extend(self, amt):
+        """Grow the table so it covers every amount up to amt."""
+
+        # already covered, so there's nothing to wait for
+        if amt < len(self.fewest_coins):
+            return
+
+        with self.lock:
+            # another thread may have grown the table while we waited
+            self._extend(amt)
+
+    def _extend(self, amt):
+        """Grow the table up to amt; the caller holds the lock."""
+
+        columns = self.columns
+        fewest_coins = self.fewest_coins
+
+        for value in xrange(len(fewest_coins), amt + 1):
+
+            # with no coins, there's only one way to make 0 cents
+            ways = 1 if value == 0 else 0
+            fewest = 0 if value == 0 else None
+            last = None
+
+            for j in xrange(len(self.denominations) - 1, -1, -1):
+                coin = self.denominations[j]
+
+                if value >= coin:
+                    ways += columns[j][value - coin]
+
+                    # one more coin than the best way to make the rest
+                    rest = fewest_coins[value - coin]
+                    if rest is not None and (fewest is None or rest + 1 < fewest):
+                        fewest = rest + 1
+                        last = coin
+
+                columns[j].append(ways)
+
+            self.ways_of_making_n_cents.append(ways)
+            fewest_coins.append(fewest)
+            self.last_coins.append(last)
+
+            # no column counts more ways than the total, so size every count
+            # like it, plus a list slot each for them, fewest and last
+            self.nbytes += (len(columns) + 1) * (sys.getsizeof(ways) + 8) + 16
+
+    def query(self, amt):
+        """Return the number of ways to make amt."""
+
+        if amt < 0:
+            return 0
+
+        self.extend(amt)
+        return self.ways_of_making_n_cents[amt]
+
+    def query_many(self, amounts):
+        """Return the number of ways to make each amount."""
+
+        amounts = list(amounts)
+
+        # size the table once, for the largest amount
+        if amounts:
+            self.extend(max(amounts))
+
+        return [self.ways_of_making_n_cents[amt] if amt >= 0 else 0
+                for amt in amounts]
+
+    def iter_combinations(self, amt):
+        """Yield each way to make amt as a tuple of coins, one at a time.
+
+        Coins come in the order of the denominations, and combinations come in
+        order, using as many of the earlier coins as possible first.
+        """
+
+        if amt < 0:
+            return
+
+        self.extend(amt)
+
+        for combination in self._iter_combinations(0, amt):
+            yield combination
+
+    def _iter_combinations(self, j, amt_left):
+        """Yield ways to make amt_left with coins j onward."""
+
+        # base case: we've used all possible denominations
+        if j == len(self.denominations):
+            if amt_left == 0:
+                yield ()
+            return
+
+        # dead branch: nothing from coins j onward adds up to amt_left
+        if self.columns[j][amt_left] == 0:
+            return
+
+        coin = self.denominations[j]
+
+        # at the last coin there's only one count that can work
+        if j == len(self.denominations) - 1:
+            if amt_left % coin == 0:
+                yield (coin,) * (amt_left // coin)
+            return
+
+        # try the most of the current coin first, skipping any count whose
+        # remainder the later coins can't make without building a generator
+        later = self.columns[j + 1]
+        for count in xrange(amt_left // coin, -1, -1):
+            rest = amt_left - count * coin
+            if later[rest] == 0:
+                continue
+
+            for combination in self._iter_combinations(j + 1, rest):
+                yield (coin,) * count + combination
+
+    def get_fewest_coins(self, amt):
+        """Return a list of the fewest coins that make amt, or None."""
+
+        if amt < 0:
+            return None
+
+        self.extend(amt)
+        if self.fewest_coins[amt] is None:
+            return None
+
+        # walk back through the last coin of each best solution
+        coins = []
+        while amt > 0:
+            coins.append(self.last_coins[amt])
+            amt -= self.last_coins[amt]
+
+        return sorted(coins, key=self.denominations.index)
+
+# Runtime: O(m) per new amount, so O(n*m) in total for the largest amount n;
+# O(1) for any amount the table already covers; O(m + k) to build each k-coin
+# combination, since every branch we enter leads to at least one, plus O(1) for
+# each count we skip at the coins before the last (at most amt / coin per branch);
+# O(k) for a k-coin breakdown
+# Space: O(n*m) for the columns, where m is the num of items in denominations
+
+
+# Keep one table per set of denominations, so a count, an enumeration and a
+# fewest-coins query for the same denominations share one DP pass. The tables
+# live in the same kind of locked LRU cache as Change's memo, capped at about
+# CHANGE_TABLES_MAX_BYTES. A table grows after we hand it out, so its size is
+# brought up to date each time it's looked up again.
+CHANGE_TABLES_MAX_BYTES = 256 << 20
+_change_tables = _TableCache(CHANGE_TABLES_MAX_BYTES)
+
+
+def get_change_table(denominations):
+    """Return the shared ChangeTable for a set of denominations.
+
+    >>> get_change_table([1, 2, 3]) is get_change_table((1, 2, 3))
+    True
+    """
+
+    denominations = tuple(denominations)
+
+    table = _change_tables.get(denominations)
+    if table is None:
+        table = ChangeTable(denominations)
+
+    # if another thread cached a table first, this returns that one instead
+    return _change_tables.put(denominations, table, table.nbytes)
+
+
+# Huge amounts: a table up to 10^12 cents is out of reach, but the number of
+# ways to make n cents is the coefficient of x^n in the generating function
+#
+#   1 / ((1 - x^c1) * (1 - x^c2) * ... * (1 - x^cm))
+#
+# so it follows a linear recurrence with d = c1 + c2 + ... + cm terms. Find the
+# coefficient with Bostan-Mori: multiplying the top and bottom of P(x) / Q(x) by
+# Q(-x) leaves only even powers on the bottom, so the coefficient of x^n comes
+# from just the even or odd half of the top, over a bottom in x^2, and n halves
+# every step.
+#
+# We never multiply out Q. It's a product of (1 - x^k) factors, and so is Q(-x):
+# each factor becomes 1 - x^k for even k, or 1 + x^k for odd k. Multiplying the
+# top by one factor is a shifted add over a NumPy array, O(d) rather than the
+# O(d^2) of a schoolbook product. The new bottom, Q(x) * Q(-x) in y = x^2, is
+# again a product of factors: (1 - x^k)(1 + x^k) = 1 - y^k for odd k, and
+# (1 - x^k)^2 = (1 - y^(k/2))^2 for even k. So we only keep the list of k's.
+def _multiply_by_factor(poly, k, modulus=None):
+    """Return poly times 1 - (-x)^k, as a NumPy array of coefficients."""
+
+    import numpy as np
+
+    product = np.zeros(len(poly) + k, dtype=poly.dtype)
+    product[:len(poly)] = poly
+
+    if k % 2:
+        product[k:] += poly
+    else:
+        product[k:] -= poly
+
+    if modulus:
+        product %= modulus
+
+    return product
+
+
+def make_change4(amt, denominations, modulus=None):
+    """Return the number of ways to make amt with coins of specific denominations.
+
+    Takes about log2(amt) steps of O(f * d) array operations, where d is the
+    sum of the denominations and f is the number of (1 - x^k) factors. f starts
+    at the number of denominations, and each coin c splits into at most the
+    largest power of two dividing c. Counts are exact Python ints unless there's
+    a modulus below 2^62, when they're int64s.
+
+    >>> make_change4(4, [1,2,3])
+    4
+
+    >>> make_change4(10 ** 12, [1, 5, 10, 25, 50, 100], 10 ** 9 + 7)
+    113293783
+
+    >>> make_change4(300, [1, 5, 10, 25, 50, 100]) == make_change3(300,
+    ...                                                 [1, 5, 10, 25, 50, 100])
+    True
+
+    >>> make_change4(5, []), make_change4(0, [])
+    (0, 1)
+    """
+
+    import numpy as np
+
+    if any(coin <= 0 for coin in denominations):
+        raise ValueError('Denominations must be positive')
+
+    if amt < 0:
+        return 0
+
+    # with no coins the only amount we can make is 0
+    if not denominations:
+        return 1 if amt == 0 else 0
+
+    # int64 is exact mod a modulus small enough that two residues can't overflow
+    dtype = np.int64 if modulus and modulus < 1 << 62 else object
+
+    # the top of the generating function, and the k's of the bottom's factors
+    top = np.ones(1, dtype=dtype)
+    factors = list(denominations)
+
+    while amt > 0:
+        # multiply the top by Q(-x), one factor at a time
+        for k in factors:
+            top = _multiply_by_factor(top, k, modulus)
+
+        # keep the half of the top with the same parity as amt
+        top = top[amt % 2::2]
+        factors = [half for k in factors
+                   for half in ((k,) if k % 2 else (k // 2, k // 2))]
+
+        amt //= 2
+
+    # the bottom always starts with 1, so the answer is the top's constant term
+    return int(top[0] % modulus) if modulus else int(top[0])
+
+# Runtime: O(f * d log n), where d is the sum of the denominations, n is amt,
+# and f is the number of factors (at most the sum of the largest power of two
+# dividing each denomination)
+# Space: O(d)
+
+
+# Batched approach for tens of thousands of (amt, denominations) pairs. Run
+# make_change3's table for every pair at once, as the rows of a NumPy matrix
+# over a shared amount axis. The order we add coins in doesn't change the
+# counts, so go through each distinct coin and update just the rows that have
+# it. Adding a coin is ways[value] += ways[value - coin] for every value, which
+# is a running sum over the values with the same remainder mod coin: reshape the
+# amount axis into rows of length coin and take a cumulative sum down the
+# columns. Counts are kept modulo a prime in int64 (exact mod p), or in float64
+# when approximate counts are enough.
+#
+# One huge amount would widen every row of a single matrix, so sort the pairs
+# by amount and take them in chunks of similar amounts, each holding at most
+# max_cells table entries (a chunk always gets at least one pair).
+def _make_change_chunk(amounts, denominations_sets, modulus, approximate):
+    """Return make_change_batch's counts for one chunk of pairs."""
+
+    import numpy as np
+
+    width = max(max(amounts), 0) + 1
+    ways = np.zeros((len(amounts), width),
+                    dtype=np.float64 if approximate else np.int64)
+    ways[:, 0] = 1
+
+    # copies[coin][i] is how many times coin appears in set i; make_change3
+    # counts a repeated coin as a separate denomination, so we add it again
+    copies = {}
+    for i, denominations in enumerate(denominations_sets):
+        for coin in denominations:
+            copies.setdefault(coin, np.zeros(len(amounts), dtype=np.int64))
+            copies[coin][i] += 1
+
+    for coin in sorted(copies):
+        if coin >= width:
+            continue
+
+        # pad the amount axis to a whole number of rows of length coin
+        height = -(-width // coin)
+
+        for copy in xrange(1, copies[coin].max() + 1):
+            rows = np.flatnonzero(copies[coin] >= copy)
+
+            padded = np.zeros((len(rows), height * coin), dtype=ways.dtype)
+            padded[:, :width] = ways[rows]
+            padded = padded.reshape(len(rows), height, coin)
+
+            np.cumsum(padded, axis=1, out=padded)
+            if not approximate:
+                padded %= modulus
+
+            ways[rows] = padded.reshape(len(rows), -1)[:, :width]
+
+    result = np.zeros(len(amounts), dtype=ways.dtype)
+    for i, amt in enumerate(amounts):
+        if amt >= 0:
+            result[i] = ways[i, amt]
+
+    return result
+
+
+def make_change_batch(amounts, denominations_sets, modulus=10 ** 9 + 7,
+                      approximate=False, max_cells=1 << 24):
+    """Return the number of ways to make each amt with its denominations.
+
+    >>> make_change_batch([4, 4, 100], [[1, 2, 3], [2], [1, 5, 10, 25, 50]]).tolist()
+    [4, 1, 292]
+
+    >>> make_change_batch([4, 4, 100], [[1, 2, 3], [2], [1, 5, 10, 25, 50]],
+    ...                   max_cells=1).tolist()
+    [4, 1, 292]
+
+    >>> make_change_batch([1000], [[1, 2, 5, 10]], approximate=True).tolist()
+    [1712051.0]
+    """
+
+    import numpy as np
+
+    amounts = list(amounts)
+    denominations_sets = [list(denominations)
+                          for denominations in denominations_sets]
+
+    if len(amounts) != len(denominations_sets):
+        raise ValueError('Need one set of denominations for each amount')
+    if any(coin <= 0 for denominations in denominations_sets
+           for coin in denominations):
+        raise ValueError('Denominations must be positive')
+    if not approximate and not 1 < modulus <= 2 ** 31:
+        raise ValueError('Modulus must fit in 31 bits to sum in int64')
+
+    result = np.zeros(len(amounts), dtype=np.float64 if approximate else np.int64)
+
+    # smallest amounts first, so each chunk's rows are about the same width
+    order = sorted(xrange(len(amounts)), key=lambda i: amounts[i])
+
+    start = 0
+    while start < len(order):
+        # grow the chunk while its table fits in max_cells; the widest row is
+        # always the last one we added
+        end = start + 1
+        while (end < len(order) and
+               (end + 1 - start) * (max(amounts[order[end]], 0) + 1) <= max_cells):
+            end += 1
+
+        chunk = order[start:end]
+        result[chunk] = _make_change_chunk([amounts[i] for i in chunk],
+                                           [denominations_sets[i] for i in chunk],
+                                           modulus, approximate)
+        start = end
+
+    return result
+
+# Runtime: O(s * n * c) vectorized, for s pairs, amounts up to n and c distinct
+# coins in each chunk
+# Space: O(max_cells), or O(n) for a single pair wider than max_cells
+
+
 if __name__ == '__main__':
 
     import doctest
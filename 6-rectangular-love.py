@@ -28,6 +28,10 @@ They are defined as dictionaries like this:
 Your output rectangle should use this format as well.
 """
 
+import heapq
+import math
+import struct
+
 def find_intersection(recA, recB):
     """Return the intersecting rectangle of two rectangles.
 
@@ -111,6 +115,626 @@ def find_intersection(recA, recB):
 # Space: O(1)
 
 
+# At matching volume, building and hashing a dict for every rectangle adds up.
+# A Rectangle keeps the same four fields in __slots__ (no per-instance dict), and
+# only allocates a result when the rectangles actually overlap. from_dict and
+# to_dict convert to and from the dictionary format at the edges.
+class Rectangle(object):
+    """A love rectangle: bottom-left corner, width and height.
+
+    >>> recA = Rectangle(0, 0, 4, 6)
+    >>> recB = Rectangle.from_dict({'left_x': 3, 'bottom_y': 2,
+    ...                             'width': 5, 'height': 3})
+    >>> recA.intersect(recB)
+    Rectangle(3, 2, 1, 3)
+    >>> recA.intersect(recB).to_dict() == find_intersection(recA.to_dict(),
+    ...                                                     recB.to_dict())
+    True
+    >>> recA.intersect(Rectangle(6, 8, 5, 4)) is None
+    True
+    """
+
+    __slots__ = ('left_x', 'bottom_y', 'width', 'height')
+
+    def __init__(self, left_x, bottom_y, width, height):
+        self.left_x = left_x
+        self.bottom_y = bottom_y
+        self.width = width
+        self.height = height
+
+    @classmethod
+    def from_dict(cls, rec):
+        """Return a Rectangle from a rectangle dictionary."""
+
+        return cls(rec['left_x'], rec['bottom_y'], rec['width'], rec['height'])
+
+    def to_dict(self):
+        """Return the rectangle in the dictionary format."""
+
+        return {'left_x': self.left_x,
+                'bottom_y': self.bottom_y,
+                'width': self.width,
+                'height': self.height}
+
+    def intersect(self, other):
+        """Return the intersecting Rectangle, or None if they don't overlap."""
+
+        left_x = max(self.left_x, other.left_x)
+        width = min(self.left_x + self.width,
+                    other.left_x + other.width) - left_x
+        if width <= 0:
+            return None
+
+        bottom_y = max(self.bottom_y, other.bottom_y)
+        height = min(self.bottom_y + self.height,
+                     other.bottom_y + other.height) - bottom_y
+        if height <= 0:
+            return None
+
+        return Rectangle(left_x, bottom_y, width, height)
+
+    def __eq__(self, other):
+        return (isinstance(other, Rectangle) and
+                (self.left_x, self.bottom_y, self.width, self.height) ==
+                (other.left_x, other.bottom_y, other.width, other.height))
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):
+        return 'Rectangle(%r, %r, %r, %r)' % (self.left_x, self.bottom_y,
+                                              self.width, self.height)
+
+# Runtime: O(1)
+# Space: O(1), with no dict per rectangle
+
+
+RECTANGLE_KEYS = ('left_x', 'bottom_y', 'width', 'height')
+
+
+def rectangles_to_columns(recs):
+    """Return a dict of NumPy columns from rectangle dictionaries.
+
+    >>> columns = rectangles_to_columns([{'left_x': 0, 'bottom_y': 0,
+    ...                                   'width': 4, 'height': 6}])
+    >>> columns['width'].tolist()
+    [4]
+    """
+
+    import numpy as np
+
+    return dict((key, np.array([rec[key] for rec in recs]))
+                for key in RECTANGLE_KEYS)
+
+
+def columns_to_rectangles(columns, mask=None):
+    """Return rectangle dictionaries from columns; None where mask is False."""
+
+    rows = zip(*[columns[key].tolist() for key in RECTANGLE_KEYS])
+    if mask is None:
+        mask = [True] * len(rows)
+
+    return [dict(zip(RECTANGLE_KEYS, row)) if valid else None
+            for row, valid in zip(rows, mask)]
+
+
+# Batched approach for millions of pairs: keep each field in its own NumPy
+# column (structure of arrays), so recsA row i is intersected with recsB row i
+# with the same max/min arithmetic as find_intersection, over whole columns.
+# Rather than None for pairs that don't overlap, return a mask of which rows are
+# valid; the result columns hold garbage wherever the mask is False.
+def find_intersections_batch(recsA, recsB):
+    """Return (mask, columns) for the intersections of each pair of rows.
+
+    >>> recsA = rectangles_to_columns([
+    ...     {'left_x': 0, 'bottom_y': 0, 'width': 4, 'height': 6},
+    ...     {'left_x': 1, 'bottom_y': 1, 'width': 4, 'height': 3}])
+    >>> recsB = rectangles_to_columns([
+    ...     {'left_x': 3, 'bottom_y': 2, 'width': 5, 'height': 3},
+    ...     {'left_x': 6, 'bottom_y': 8, 'width': 5, 'height': 4}])
+    >>> mask, overlap = find_intersections_batch(recsA, recsB)
+    >>> mask.tolist()
+    [True, False]
+    >>> columns_to_rectangles(overlap, mask) == [
+    ...     {'left_x': 3, 'bottom_y': 2, 'width': 1, 'height': 3}, None]
+    True
+    """
+
+    import numpy as np
+
+    overlap = {}
+
+    overlap['left_x'] = np.maximum(recsA['left_x'], recsB['left_x'])
+    overlap['width'] = np.minimum(recsA['left_x'] + recsA['width'],
+                                  recsB['left_x'] + recsB['width']) - overlap['left_x']
+
+    overlap['bottom_y'] = np.maximum(recsA['bottom_y'], recsB['bottom_y'])
+    overlap['height'] = np.minimum(recsA['bottom_y'] + recsA['height'],
+                                   recsB['bottom_y'] + recsB['height']) - overlap['bottom_y']
+
+    # make sure the rectangles are overlapping
+    mask = (overlap['width'] > 0) & (overlap['height'] > 0)
+
+    return mask, overlap
+
+# Runtime: O(n) for n pairs, vectorized
+# Space: O(n) for the mask and four result columns
+
+
+# All-pairs join: rather than calling find_intersection on every pair, sweep a
+# vertical line from left to right. A rectangle is active while the line is
+# between its left and right edges, and every overlapping pair is active at the
+# same time when the rightmost of the two left edges is passed. So when a
+# rectangle R starts, it overlaps exactly the active rectangles S whose y ranges
+# overlap R's, which means either S's bottom is in [R's bottom, R's top), or
+# S's range strictly contains R's bottom. Both are answered with segment trees
+# over the distinct y coordinates:
+#   - bottoms: the active rectangles whose bottom is at each y, with a count in
+#     every node so a range query can skip empty subtrees
+#   - spans: each active rectangle's y range, stored in the O(log N) nodes that
+#     cover it, so every rectangle spanning a point lies on that point's path
+#     to the root
+# Edges that only touch don't overlap, so at the same x we remove rectangles
+# before adding new ones.
+class _BottomsTree(object):
+    """Active rectangle ids by bottom, answering range queries."""
+
+    def __init__(self, size):
+        self.size = size
+        self.counts = [0] * (2 * size)
+
+        # leaf -> set of ids, only for leaves that have any
+        self.leaves = {}
+
+    def _add(self, y, rec_id, delta):
+        if delta > 0:
+            self.leaves.setdefault(y, set()).add(rec_id)
+        else:
+            ids = self.leaves[y]
+            ids.discard(rec_id)
+            if not ids:
+                del self.leaves[y]
+
+        node = self.size + y
+        while node:
+            self.counts[node] += delta
+            node //= 2
+
+    def insert(self, y, rec_id):
+        self._add(y, rec_id, 1)
+
+    def remove(self, y, rec_id):
+        self._add(y, rec_id, -1)
+
+    def query(self, lo, hi):
+        """Yield ids with a bottom in [lo, hi)."""
+
+        stack = [(1, 0, self.size)]
+        while stack:
+            node, node_lo, node_hi = stack.pop()
+
+            # skip empty subtrees and subtrees outside the range
+            if not self.counts[node] or node_hi <= lo or hi <= node_lo:
+                continue
+
+            if node_hi - node_lo == 1:
+                for rec_id in self.leaves.get(node_lo, ()):
+                    yield rec_id
+                continue
+
+            mid = (node_lo + node_hi) // 2
+            stack.append((2 * node + 1, mid, node_hi))
+            stack.append((2 * node, node_lo, mid))
+
+
+class _SpansTree(object):
+    """Active rectangle ids by y range, answering stabbing queries."""
+
+    def __init__(self, size):
+        self.size = size
+
+        # node -> set of ids, only for nodes that have any
+        self.nodes = {}
+
+    def _cover(self, lo, hi):
+        """Yield the canonical nodes that exactly cover [lo, hi)."""
+
+        lo += self.size
+        hi += self.size
+        while lo < hi:
+            if lo & 1:
+                yield lo
+                lo += 1
+            if hi & 1:
+                hi -= 1
+                yield hi
+            lo //= 2
+            hi //= 2
+
+    def insert(self, lo, hi, rec_id):
+        for node in self._cover(lo, hi):
+            self.nodes.setdefault(node, set()).add(rec_id)
+
+    def remove(self, lo, hi, rec_id):
+        for node in self._cover(lo, hi):
+            ids = self.nodes[node]
+            ids.discard(rec_id)
+            if not ids:
+                del self.nodes[node]
+
+    def query(self, y):
+        """Yield ids whose range contains y."""
+
+        node = self.size + y
+        while node:
+            for rec_id in self.nodes.get(node, ()):
+                yield rec_id
+            node //= 2
+
+
+def iter_all_intersections(recs):
+    """Yield (i, j, intersection) for every pair of overlapping rectangles, i < j.
+
+    >>> recs = [{'left_x': 0, 'bottom_y': 0, 'width': 4, 'height': 6},
+    ...         {'left_x': 3, 'bottom_y': 2, 'width': 5, 'height': 3},
+    ...         {'left_x': 1, 'bottom_y': 1, 'width': 4, 'height': 3},
+    ...         {'left_x': 6, 'bottom_y': 8, 'width': 5, 'height': 4},
+    ...         {'left_x': 4, 'bottom_y': 0, 'width': 1, 'height': 1}]
+    >>> for i, j, overlap in sorted(iter_all_intersections(recs)):
+    ...     print i, j, sorted(overlap.items())
+    0 1 [('bottom_y', 2), ('height', 3), ('left_x', 3), ('width', 1)]
+    0 2 [('bottom_y', 1), ('height', 3), ('left_x', 1), ('width', 3)]
+    1 2 [('bottom_y', 2), ('height', 2), ('left_x', 3), ('width', 2)]
+    """
+
+    # rectangles with no area can't overlap anything
+    live = [i for i, rec in enumerate(recs)
+            if rec['width'] > 0 and rec['height'] > 0]
+
+    # compress the y coordinates to leaf indices
+    ys = sorted(set([recs[i]['bottom_y'] for i in live] +
+                    [recs[i]['bottom_y'] + recs[i]['height'] for i in live]))
+    y_index = dict((y, idx) for idx, y in enumerate(ys))
+
+    size = 1
+    while size < len(ys):
+        size *= 2
+
+    bottoms = _BottomsTree(size)
+    spans = _SpansTree(size)
+
+    # (x, 0, id) removes at a right edge, sorting before (x, 1, id) at a left edge
+    events = []
+    for i in live:
+        events.append((recs[i]['left_x'], 1, i))
+        events.append((recs[i]['left_x'] + recs[i]['width'], 0, i))
+    events.sort()
+
+    for _, is_start, i in events:
+        rec = recs[i]
+        lo = y_index[rec['bottom_y']]
+        hi = y_index[rec['bottom_y'] + rec['height']]
+
+        if not is_start:
+            bottoms.remove(lo, i)
+            spans.remove(lo, hi, i)
+            continue
+
+        # active rectangles starting within our y range, then those that
+        # started strictly below our bottom and are still open above it
+        matches = list(bottoms.query(lo, hi))
+        matches.extend(j for j in spans.query(lo)
+                       if recs[j]['bottom_y'] < rec['bottom_y'])
+
+        for j in matches:
+            yield min(i, j), max(i, j), find_intersection(recs[min(i, j)],
+                                                          recs[max(i, j)])
+
+        bottoms.insert(lo, i)
+        spans.insert(lo, hi, i)
+
+# Runtime: O((N + K) log N) for N rectangles and K overlapping pairs: a sort,
+# O(log N) per tree update, and each reported pair costs at most one root-to-leaf
+# path. Pairs are yielded as they're found, so K never has to fit in memory.
+# Space: O(N) for the counts, plus O(A log N) buckets for the A rectangles
+# active at once; buckets are only allocated while they hold an id
+
+
+# Online matching: each new profile has to find the existing profiles it
+# overlaps. Bucket the rectangles into a uniform grid of square cells, where each
+# cell keeps the ids of the rectangles that cover it. A query only looks at the
+# rectangles in the cells it covers, then intersects each candidate once. With
+# cells about the size of a typical rectangle, that's a handful of cells and
+# candidates per query, however many rectangles are indexed. There's no good
+# default for that size, so the caller has to pick one.
+#
+# A rectangle much bigger than the cells would fill a bucket for every cell it
+# covers, so one that covers more than max_cells cells goes in a separate list
+# of large rectangles instead, which every query checks. Likewise a query that
+# covers more cells than there are buckets walks the buckets, not the cells.
+#
+# To survive restarts, save writes a small header, one fixed-width record per
+# rectangle (id plus four coordinates, as int64s or float64s), then each cell's
+# bucket of ids. load reads them straight back into the index, without pickling
+# anything or working out which cells each rectangle covers again.
+class RectangleIndex(object):
+    """Index rectangles for overlap and top-k-by-overlap-area queries.
+
+    >>> index = RectangleIndex(cell_size=4)
+    >>> index.insert({'left_x': 0, 'bottom_y': 0, 'width': 4, 'height': 6})
+    0
+    >>> index.insert({'left_x': 1, 'bottom_y': 1, 'width': 4, 'height': 3})
+    1
+    >>> index.insert({'left_x': 6, 'bottom_y': 8, 'width': 5, 'height': 4})
+    2
+    >>> rec = {'left_x': 3, 'bottom_y': 2, 'width': 5, 'height': 3}
+    >>> [rec_id for rec_id, _ in index.query_overlaps(rec)]
+    [0, 1]
+    >>> [(rec_id, area) for rec_id, area, _ in index.get_top_overlaps(rec, 1)]
+    [(1, 4)]
+    >>> index.delete(1)
+    >>> [rec_id for rec_id, _ in index.query_overlaps(rec)]
+    [0]
+
+    >>> big = index.insert({'left_x': -500, 'bottom_y': -500,
+    ...                     'width': 1000, 'height': 1000})
+    >>> len(index.cells), sorted(index.large)
+    (4, [3])
+    >>> [rec_id for rec_id, _ in index.query_overlaps(rec)]
+    [0, 3]
+    >>> index.delete(big)
+
+    >>> import os, tempfile
+    >>> fd, path = tempfile.mkstemp()
+    >>> os.close(fd)
+    >>> index.save(path)
+    >>> loaded = RectangleIndex.load(path)
+    >>> [rec_id for rec_id, _ in loaded.query_overlaps(rec)]
+    [0]
+    >>> loaded.insert(rec)
+    4
+    >>> os.remove(path)
+    """
+
+    # magic, format version, coordinate type ('q' or 'd'), cell size, the most
+    # cells a rectangle can have buckets in, counts of rectangles and cells,
+    # and the next id to hand out, so ids aren't reused after a reload
+    HEADER = struct.Struct('<4sBcdqqqq')
+    MAGIC = 'RIDX'
+    VERSION = 3
+
+    # a cell's x, y and number of ids, followed by the ids as int64s
+    CELL = struct.Struct('<qqq')
+
+    def __init__(self, cell_size, max_cells=64):
+        if cell_size <= 0:
+            raise ValueError('Cell size must be positive')
+        if max_cells < 1:
+            raise ValueError('max_cells must be at least 1')
+
+        self.cell_size = cell_size
+        self.max_cells = max_cells
+        self.rects = {}
+        self.cells = {}
+        self.next_id = 0
+
+        # ids of rectangles covering more than max_cells cells
+        self.large = set()
+
+    def _cell_bounds(self, rect):
+        """Return first_x, last_x, first_y, last_y for a rectangle's cells."""
+
+        # cells are half open, like the rectangles: [left, left + cell_size)
+        first_x = int(math.floor(rect.left_x / float(self.cell_size)))
+        last_x = int(math.ceil((rect.left_x + rect.width) /
+                               float(self.cell_size))) - 1
+        first_y = int(math.floor(rect.bottom_y / float(self.cell_size)))
+        last_y = int(math.ceil((rect.bottom_y + rect.height) /
+                               float(self.cell_size))) - 1
+
+        return first_x, last_x, first_y, last_y
+
+    def _cell_count(self, rect):
+        """Return how many cells a rectangle covers."""
+
+        first_x, last_x, first_y, last_y = self._cell_bounds(rect)
+
+        return max(last_x - first_x + 1, 0) * max(last_y - first_y + 1, 0)
+
+    def _cells(self, rect):
+        """Yield the (x, y) cells a rectangle covers."""
+
+        first_x, last_x, first_y, last_y = self._cell_bounds(rect)
+
+        for x in xrange(first_x, last_x + 1):
+            for y in xrange(first_y, last_y + 1):
+                yield x, y
+
+    def _buckets(self, rect):
+        """Yield the non-empty buckets of the cells a rectangle covers."""
+
+        # walk whichever is fewer: the cells it covers, or the buckets we have
+        if self._cell_count(rect) <= len(self.cells):
+            for cell in self._cells(rect):
+                if cell in self.cells:
+                    yield self.cells[cell]
+        else:
+            first_x, last_x, first_y, last_y = self._cell_bounds(rect)
+            for (x, y), ids in self.cells.iteritems():
+                if first_x <= x <= last_x and first_y <= y <= last_y:
+                    yield ids
+
+    def insert(self, rec, rec_id=None):
+        """Add a rectangle dictionary; return its id."""
+
+        if rec_id is None:
+            rec_id = self.next_id
+        if rec_id in self.rects:
+            raise KeyError('Rectangle %r is already indexed' % rec_id)
+        self.next_id = max(self.next_id, rec_id + 1)
+
+        rect = Rectangle.from_dict(rec)
+        self.rects[rec_id] = rect
+
+        if self._cell_count(rect) > self.max_cells:
+            self.large.add(rec_id)
+            return rec_id
+
+        for cell in self._cells(rect):
+            self.cells.setdefault(cell, set()).add(rec_id)
+
+        return rec_id
+
+    def delete(self, rec_id):
+        """Remove a rectangle by id."""
+
+        rect = self.rects.pop(rec_id)
+
+        if rec_id in self.large:
+            self.large.remove(rec_id)
+            return
+
+        for cell in self._cells(rect):
+            ids = self.cells[cell]
+            ids.discard(rec_id)
+            if not ids:
+                del self.cells[cell]
+
+    def _overlaps(self, rec):
+        """Yield (id, intersecting Rectangle) for each overlapping rectangle."""
+
+        rect = Rectangle.from_dict(rec)
+
+        # a rectangle spanning several cells is only checked once
+        seen = set()
+        for ids in self._buckets(rect):
+            for rec_id in ids:
+                if rec_id in seen:
+                    continue
+                seen.add(rec_id)
+
+                overlap = rect.intersect(self.rects[rec_id])
+                if overlap is not None:
+                    yield rec_id, overlap
+
+        for rec_id in self.large:
+            overlap = rect.intersect(self.rects[rec_id])
+            if overlap is not None:
+                yield rec_id, overlap
+
+    def query_overlaps(self, rec):
+        """Return (id, intersection) for each overlapping rectangle, by id."""
+
+        return sorted((rec_id, overlap.to_dict())
+                      for rec_id, overlap in self._overlaps(rec))
+
+    def get_top_overlaps(self, rec, k):
+        """Return (id, area, intersection) for the k largest overlaps."""
+
+        top = heapq.nlargest(k, ((overlap.width * overlap.height, -rec_id,
+                                  overlap)
+                                 for rec_id, overlap in self._overlaps(rec)))
+
+        return [(-neg_id, area, overlap.to_dict())
+                for area, neg_id, overlap in top]
+
+    def save(self, path):
+        """Write the index to a binary file."""
+
+        rects = sorted(self.rects.items())
+        cells = sorted(self.cells.items())
+
+        # keep integer coordinates as integers
+        is_int = all(isinstance(value, (int, long))
+                     for _, rect in rects
+                     for value in (rect.left_x, rect.bottom_y,
+                                   rect.width, rect.height))
+        code = 'q' if is_int else 'd'
+        record = struct.Struct('<q4' + code)
+
+        with open(path, 'wb') as f:
+            f.write(self.HEADER.pack(self.MAGIC, self.VERSION, code,
+                                     self.cell_size, self.max_cells,
+                                     len(rects), len(cells), self.next_id))
+            f.writelines(record.pack(rec_id, rect.left_x, rect.bottom_y,
+                                     rect.width, rect.height)
+                         for rec_id, rect in rects)
+
+            # each cell bucket, so load doesn't have to recompute them
+            for (x, y), ids in cells:
+                f.write(self.CELL.pack(x, y, len(ids)))
+                f.write(struct.pack('<%iq' % len(ids), *sorted(ids)))
+
+    @classmethod
+    def load(cls, path):
+        """Return an index read from a binary file written by save."""
+
+        with open(path, 'rb') as f:
+            data = f.read()
+
+        if len(data) < cls.HEADER.size:
+            raise ValueError('%s is too short to be a RectangleIndex' % path)
+
+        (magic, version, code, cell_size, max_cells,
+         count, cell_count, next_id) = cls.HEADER.unpack_from(data)
+        if magic != cls.MAGIC or version != cls.VERSION or code not in 'qd':
+            raise ValueError('%s is not a saved RectangleIndex' % path)
+
+        record = struct.Struct('<q4' + code)
+        offset = cls.HEADER.size
+
+        def check(size):
+            if offset + size > len(data):
+                raise ValueError('%s is truncated' % path)
+
+        if cell_size.is_integer():
+            cell_size = int(cell_size)
+        index = cls(cell_size, max_cells)
+        index.next_id = next_id
+
+        check(record.size * count)
+        for _ in xrange(count):
+            rec_id, left_x, bottom_y, width, height = record.unpack_from(data,
+                                                                         offset)
+            rect = Rectangle(left_x, bottom_y, width, height)
+            index.rects[rec_id] = rect
+            offset += record.size
+
+            # large rectangles have no buckets; counting their cells is O(1)
+            if index._cell_count(rect) > max_cells:
+                index.large.add(rec_id)
+
+        # read the cell buckets back as they were saved
+        for _ in xrange(cell_count):
+            check(cls.CELL.size)
+            x, y, size = cls.CELL.unpack_from(data, offset)
+            offset += cls.CELL.size
+
+            check(8 * size)
+            ids = set(struct.unpack_from('<%iq' % size, data, offset))
+            offset += 8 * size
+
+            # a bucket naming a rectangle we don't have would only show up as a
+            # KeyError in some later query
+            if not ids <= index.rects.viewkeys() or ids & index.large:
+                raise ValueError('%s has cell %r with unknown or large ids'
+                                 % (path, (x, y)))
+            index.cells[x, y] = ids
+
+        if offset != len(data):
+            raise ValueError('%s has trailing data' % path)
+
+        return index
+
+# Runtime: O(c) per insert or delete, where c is the number of cells the
+# rectangle covers, at most max_cells (O(1) for a large rectangle); O(min(c, B)
+# + r + L) per query, where B is the number of non-empty buckets, r the
+# rectangles in the buckets it covers and L the number of large rectangles;
+# O(N * max_cells) to save or load, reading the saved buckets rather than
+# recomputing each rectangle's cells
+# Space: O(N * max_cells) for the cells
+
+
 if __name__ == '__main__':
 
     import doctest